@@ -11,6 +11,15 @@ from ..pyminisolvers import minisolvers
 from . import utils
 
 
+class GroupCNF(collections.namedtuple('GroupCNF', ['nvars', 'groups'])):
+    """Clause groups given in memory, in place of a (g)cnf file.
+
+    groups maps each group ID to its clauses, as an array of 0-terminated clauses (e.g., array('i', [1, -2, 0, 3, 0])).
+    As in a gcnf, soft groups have IDs from 1 to n, and group 0 (if any) holds the hard clauses.
+    Variables range from 1 to nvars."""
+    __slots__ = ()
+
+
 class MinisatSubsetSolver:
     def __init__(self, filename, rand_seed=None, n_only=False, store_dimacs=False):
         self.s = minisolvers.MinisatSubsetSolver()
@@ -26,7 +35,10 @@ class MinisatSubsetSolver:
         if self.store_dimacs:
             self.dimacs = []
             self.groups = collections.defaultdict(list)
-        self.read_dimacs(filename)
+        if isinstance(filename, GroupCNF):
+            self.load_groups(filename)
+        else:
+            self.read_dimacs(filename)
         self._msolver = None
 
     def set_msolver(self, msolver):
@@ -101,6 +113,36 @@ class MinisatSubsetSolver:
 
         assert i == self.nclauses
 
+    def load_groups(self, gcnf):
+        # Same as parse_dimacs, for clause groups given in memory (see GroupCNF).
+        self.nvars = gcnf.nvars
+        self.nclauses = sum(lits.count(0) for lits in gcnf.groups.values())
+        self.n = sum(1 for groupid in gcnf.groups if groupid != 0)
+        if self.n_only:
+            return
+
+        self.s.set_varcounts(self.nvars, self.n)
+        self.s.new_vars(self.nvars)
+        self.s.new_vars(self.n, True)
+
+        i = 0
+        for groupid, lits in gcnf.groups.items():
+            assert 0 <= groupid <= self.n
+            if groupid == 0:
+                self.s.add_clauses(lits)
+            else:
+                self.s.add_clauses_instrumented(lits, groupid-1)
+
+            if self.store_dimacs:
+                # MUSer2 still reads the clauses from a file: render them once, as parse_dimacs does.
+                start = 0
+                while start < len(lits):
+                    end = lits.index(0, start)
+                    self.dimacs.append(" ".join(map(str, lits[start:end+1])).encode() + b"\n")
+                    self.groups[groupid].append(i)
+                    i += 1
+                    start = end + 1
+
     def read_dimacs(self, filename):
         if filename.endswith('.gz'):
             # use gzip to decompress
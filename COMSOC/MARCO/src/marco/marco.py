@@ -138,6 +138,10 @@ def check_args(args):
             sys.exit(1)
         sys.exit(0)
 
+    if getattr(args, 'groups', None) is not None:
+        # clause groups given in memory (see enumerate_groups)
+        return
+
     if not (args.smt or args.cnf or args.inputfile.name.endswith(('.cnf', '.cnf.gz', '.gcnf', '.gcnf.gz', '.smt2'))):
         error_exit(
             f"Cannot determine filetype (cnf or smt) of input: {args.inputfile.name}",
@@ -262,10 +266,11 @@ def setup_parallel(args, stats) -> tuple[Queue, list[Queue], list[Process]]:
 
 
 def setup_csolver(args, seed, n_only=False):
-    filename = args.inputfile.name
+    groups = getattr(args, 'groups', None)
+    filename = args.inputfile.name if groups is None else None
 
     # create appropriate constraint solver
-    if args.cnf or filename.endswith(('.cnf', '.cnf.gz', '.gcnf', '.gcnf.gz')):
+    if groups is not None or args.cnf or filename.endswith(('.cnf', '.cnf.gz', '.gcnf', '.gcnf.gz')):
         if args.force_minisat or args.mcs_only:  # mcs_only doesn't care about fancy features, give it a plain MinisatSubsetSolver
             solverclass = CNFsolvers.MinisatSubsetSolver
         elif args.improved_implies:
@@ -277,7 +282,7 @@ def setup_csolver(args, seed, n_only=False):
             extra_args = {}
             if args.mcs_only:
                 extra_args['store_dimacs'] = True
-            csolver = solverclass(filename, seed, n_only, **extra_args)
+            csolver = solverclass(filename if groups is None else groups, seed, n_only, **extra_args)
         except utils.ExecutableException as e:
             error_exit("Unable to use MUSer2 for MUS extraction.", "Use --force-minisat to use Minisat instead (NOTE: it will be much slower.)", e)
         except OSError as e:
@@ -514,6 +519,27 @@ def enumerate_with_args(args, print_results=False):
             return
 
 
+def enumerate_groups(nvars, groups, args_list=(), print_results=False):
+    '''Enumerate (yield) results for clause groups given in memory, rather than in a file.
+
+    Parameters:
+        nvars (int): Number of variables (numbered from 1).
+        groups (dict): Maps each group ID to its clauses, as an array of
+                       0-terminated clauses (see CNFsolvers.GroupCNF).
+                       Group 0, if present, holds the hard clauses.
+        args_list (list of strings): Further options, as for parse_args().
+        print_results (bool): As for enumerate_with_args().
+
+    The groups are loaded directly into the solvers of the master and of
+    every child: no file is written or parsed.
+    '''
+    # os.devnull stands for the input file, which is never read.
+    args = parse_args([os.devnull, '--cnf', *args_list])
+    args.inputfile = None
+    args.groups = CNFsolvers.GroupCNF(nvars, groups)
+    return enumerate_with_args(args, print_results)
+
+
 def main():
     args = parse_args()
     for result in enumerate_with_args(args, print_results=True):
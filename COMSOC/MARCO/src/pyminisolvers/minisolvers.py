@@ -255,6 +255,31 @@ class Solver(metaclass=ABCMeta):
         else:
             return self.lib.addClause(self.s, 0, None)
 
+    def add_clauses(self, lits: array[int]) -> bool:
+        """Add many clauses to the solver at once.
+
+        Args:
+            lits:
+              An array of literals (specified as in `add_clause()`) holding
+              the clauses one after the other, each one terminated by a 0.
+              Ex.: array('i', [-1, 2, 0, 3, 0]) is (!x0 + x1) * (x2)
+
+        Returns:
+            False if some clause produced a conflict, True otherwise.
+        """
+        if lits and max(max(lits), -min(lits)) > self.nvars():
+            raise Exception("Not all variables in the clauses are created yet.  Call new_var() or new_vars() first.")
+        # The clauses are passed to MiniSat straight from the array, without copying them.
+        addr, _ = lits.buffer_info()
+        itemsize = lits.itemsize
+        ret = True
+        start = 0
+        while start < len(lits):
+            end = lits.index(0, start)
+            ret = self.lib.addClause(self.s, end - start, addr + start*itemsize) and ret
+            start = end + 1
+        return ret
+
     def check_complete(self, positive_lits: Optional[Sequence[int]] = None, negative_lits: Optional[Sequence[int]] = None) -> bool:
         """Check whether a given complete assignment satisfies the current set
         of clauses.  For efficiency, it may be given just the positive literals
@@ -420,6 +445,28 @@ class SubsetMixin(Solver):
         instrumented_clause.extend(lits)
         self.add_clause(instrumented_clause)
 
+    def add_clauses_instrumented(self, lits: array[int], index: int) -> None:
+        """Add many clauses as a single "soft" constraint: they share the
+        relaxation variable of the given index (as in `add_clause_instrumented()`).
+
+        Args:
+            lits:
+                An array of 0-terminated clauses, specified as in `add_clauses()`.
+            index (int):
+                A 0-based index into the set of soft constraints.
+        """
+        if self._origvars is None:
+            raise Exception("SubsetSolver.set_varcounts() must be called before .add_clauses_instrumented()")
+        relaxation = -(self._origvars+1+index)
+        instrumented = array('i')
+        start = 0
+        while start < len(lits):
+            end = lits.index(0, start)
+            instrumented.append(relaxation)
+            instrumented.extend(lits[start:end+1])
+            start = end + 1
+        self.add_clauses(instrumented)
+
     def solve_subset(self, subset: Sequence[int], extra_assumps: Optional[Sequence[int]] = None) -> bool:
         """Solve a subset of the constraints containing all "hard" clauses
         (those added with the regular `add_clause()` method) and the
@@ -1,8 +1,9 @@
 from COMSOC.interfaces.axioms import Axiom, IntraprofileAxiom, InterprofileAxiom, Instance
 import COMSOC.anonymous.model as model
 
-from typing import List, Set, Type
-from itertools import permutations, combinations
+from typing import Iterator, List, Set, Type
+from itertools import permutations, combinations, product, islice
+from collections import defaultdict
 
 from COMSOC.helpers import powerset
 
@@ -14,6 +15,8 @@ class AtLeastOne(IntraprofileAxiom):
 
     """Axiom encoding the fact that, for every profile, at least one alternative must win."""
 
+    neutral = True
+
     def getInstances(self) -> Set:
         return {AtLeastOneInstance(profile) for profile in self.scenario.profiles}
 
@@ -29,6 +32,8 @@ class AtLeastOneInstance(Instance):
 
     """Instance of the `At Least One` axiom."""
 
+    __slots__ = ('_profile', '_SATarrays', 'created_by')
+
     def __init__(self, profile):
         self._profile = profile
 
@@ -58,6 +63,13 @@ class AtLeastOneInstance(Instance):
     def _hashable(self):
         return self._profile
 
+    def _pack(self, scenario):
+        return (scenario.rankProfile(self._profile),)
+
+    @classmethod
+    def _unpack(cls, scenario, packed):
+        return cls(scenario.unrankProfile(*packed))
+
     def __str__(self):
         return f"In profile ({self._profile}) at least one alternative must win."
 
@@ -65,6 +77,8 @@ class Faithfulness(IntraprofileAxiom):
 
     """Axiom encoding the fact that, if there is only one voter, her top-ranked alternative must be the unique winner."""
 
+    neutral = True
+
     def getInstances(self) -> Set:
         return {FaithfulnessInstance(profile) for profile in self.scenario.profilesOfSize(1)}
 
@@ -98,6 +112,8 @@ class FaithfulnessInstance(Instance):
 
     """Instance of the Faithfulness Axiom."""
 
+    __slots__ = ('_profile', '_winner', '_SATarrays', 'created_by')
+
     def __init__(self, profile):
         self._profile = profile
         self._winner = profile.top()
@@ -131,6 +147,13 @@ class FaithfulnessInstance(Instance):
         else:
             return f"Since {profile} has only one voter, by Faithfulness, that voter's favourite alternative, {self._winner}, should be the unique winner."
 
+    def _pack(self, scenario):
+        return (scenario.rankProfile(self._profile),)
+
+    @classmethod
+    def _unpack(cls, scenario, packed):
+        return cls(scenario.unrankProfile(*packed))
+
     def __str__(self):
         return f"In profile ({self._profile}) there is only one voter. Hence, that voter's favourite alternative should win."
 
@@ -138,21 +161,16 @@ class Pareto(IntraprofileAxiom):
 
     """Axiom encoding the fact that no dominated alternative can win."""
 
+    neutral = True
+
     def getInstances(self) -> Set:
-        insts = set()
-        for profile in self.scenario.profiles:
-            # This returns the set of instances regarding `profile`
-            # (possibly empty).
-            insts.update(self.getInstancesMentioning(profile))
-        return insts
+        # Generate 1 instance for every pareto-dom alternative x of every profile.
+        return {ParetoInstance(profile, x) for profile, dominated in self.scenario.propertyTable.paretoDominatedAlternatives()\
+            for x in dominated}
 
     def getInstancesMentioning(self, profile) -> Set:
         # Generate 1 instance for every pareto-dom alternative x.
-        insts = set()
-        for x in profile.alternatives:
-            if profile.isParetoDom(x):
-                insts.add(ParetoInstance(profile, x))
-        return insts
+        return {ParetoInstance(profile, x) for x in profile.paretoDominated()}
 
     def tree_asp(self):
         """Return the ASP facts, rules and constraints necessary to encode the Pareto rule."""
@@ -180,6 +198,8 @@ class ParetoInstance(Instance):
 
     """Instance of the `Pareto Principle` axiom."""
 
+    __slots__ = ('_profile', '_dominated', '_SATarrays', 'created_by')
+
     def __init__(self, profile, dominated):
         self._profile = profile
         self._dominated = dominated
@@ -211,6 +231,15 @@ class ParetoInstance(Instance):
         else:
             return f"In profile {profile}, alternative {self._dominated} is Pareto-dominated. Hence, it cannot be among the winners."
 
+    def _pack(self, scenario):
+        return (scenario.rankProfile(self._profile), self._profile._table.altIndex[self._dominated])
+
+    @classmethod
+    def _unpack(cls, scenario, packed):
+        rank, dominated = packed
+        profile = scenario.unrankProfile(rank)
+        return cls(profile, profile._table.order[dominated])
+
     def __str__(self):
         return f"In profile ({self._profile}) alternative {self._dominated} is Pareto-dominated. Hence, it cannot be among the winners."        
 
@@ -218,8 +247,10 @@ class Cancellation(IntraprofileAxiom):
 
     """Axiom encoding the fact that, if all alternatives tie in majority contests, all alternatives win."""
 
+    neutral = True
+
     def getInstances(self) -> Set:
-        return {CancellationInstance(profile) for profile in self.scenario.profiles if profile.isPerfectTie()}
+        return {CancellationInstance(profile) for profile in self.scenario.propertyTable.perfectTies()}
 
     def getInstancesMentioning(self, profile) -> Set:
         return {CancellationInstance(profile)} if profile.isPerfectTie() else set()
@@ -250,6 +281,8 @@ class CancellationInstance(Instance):
 
     """Instance of the `Cancellation` axiom."""
 
+    __slots__ = ('_profile', '_SATarrays', 'created_by')
+
     def __init__(self, profile):
         self._profile = profile
 
@@ -277,6 +310,13 @@ class CancellationInstance(Instance):
     def from_asp(self, fact : str, encoding, prettify = False) -> str:
         return f"Profile {encoding.encode_profile(self._profile, prettify = prettify)} is a perfect tie: by Cancellation, all alternatives must win here."
 
+    def _pack(self, scenario):
+        return (scenario.rankProfile(self._profile),)
+
+    @classmethod
+    def _unpack(cls, scenario, packed):
+        return cls(scenario.unrankProfile(*packed))
+
     def __str__(self):
         return f"Profile ({self._profile}) is a perfect tie: all alternatives must win here."
 
@@ -284,8 +324,10 @@ class Condorcet(IntraprofileAxiom):
 
     """Axiom encoding the fact that, if a Condorcet winner exists, it must win."""
 
+    neutral = True
+
     def getInstances(self) -> Set:
-        return {CondorcetInstance(profile) for profile in self.scenario.profiles if profile.hasCondorcetWinner()}
+        return {CondorcetInstance(profile) for profile, _ in self.scenario.propertyTable.condorcetWinners()}
 
     def getInstancesMentioning(self, profile) -> Set:
         return {CondorcetInstance(profile)} if profile.hasCondorcetWinner() else set()
@@ -314,6 +356,8 @@ class CondorcetInstance(Instance):
 
     """Instance of the `Condorcet` axiom."""
 
+    __slots__ = ('_profile', '_winner', '_SATarrays', 'created_by')
+
     def __init__(self, profile):
         self._profile = profile
         self._winner = profile.condorcetWinner()
@@ -346,6 +390,13 @@ class CondorcetInstance(Instance):
         else:
             return f"Alternative {self._winner} is the Condorcet winner of profile {profile}. Hence, it must be the unique winner."
 
+    def _pack(self, scenario):
+        return (scenario.rankProfile(self._profile),)
+
+    @classmethod
+    def _unpack(cls, scenario, packed):
+        return cls(scenario.unrankProfile(*packed))
+
     def __str__(self):
         return f"Alternative {self._winner} is the Condorcet winner of profile {self._profile}. Hence, it must be the unique winner."
 
@@ -355,35 +406,36 @@ class Neutrality(InterprofileAxiom):
 
     """Axiom encoding the fact that all alternatives must be treated equally."""
 
+    forcesNeutrality = True
+
     def _getMappingIfPermutable(self, profile1, profile2):
 
         """If there exists a mapping of alternatives M so that M(p) = q, return it. Otherwise, return None."""
 
+        # Profiles equal up to renaming the alternatives have the same canonical form.
+        if profile1.canonicalForm()[0] != profile2.canonicalForm()[0]:
+            return None
+
         # Get ANY pair (ballot, count) from profile1.
         # We will use this ballot as a reference to construct the candidate mappings.
         for reference_ballot, reference_count in profile1.ballotsWithCounts():
             break
 
-        p2dict = profile2.as_dict()
+        table = profile1._table
 
         # For every ballot, count of profile2:
-        for ballot, count in p2dict.items():
+        for ballot, count in profile2.ballotsWithCounts():
             # If the count of this ballot matches the count of our reference ballot,
             if count == reference_count:
                 # Construct the mapping from our reference to this ballot.
                 candidate_mapping = {i:j for i, j in zip(reference_ballot, ballot)}
 
-                # Now, construct the resulting dictionary by applying this mapping to all
-                # ballots of profile2.
-                new_profile_dict = {}
-                for ballot2, count2 in profile1.ballotsWithCounts():
-                    new_profile_dict[model.AnonymousPreference(candidate_mapping[b] for b in ballot2)] = count2
-
-                # If this new dictionary is equal to the dictionary of profile2, return this one.
-                if new_profile_dict == p2dict:
+                # Now, apply this mapping to all ballots of profile1. If we get profile2, return this one.
+                _, relabelling = table.renamings[table.renamingIndex(candidate_mapping)]
+                if table.rename(profile1.counts, relabelling) == profile2.counts:
                     return candidate_mapping
 
-        # Nothing found.
+        # Nothing found (cannot happen, since the canonical forms are equal).
         return None
 
     def getInstances(self):
@@ -391,17 +443,41 @@ class Neutrality(InterprofileAxiom):
 
         # For all possible sizes of profiles:
         for size in range(1, self.scenario.nVoters+1):
-            # For all two unordered pairs of profiles of this size,
-            for p, q in combinations(self.scenario.profilesOfSize(size), 2):
-                # if it exists, construct the mapping, and make the corresponding instance.
+            # Group the profiles of this size by canonical form: two profiles can be mapped into each other
+            # if and only if they are in the same orbit, and orbits have at most m! profiles.
+            orbits = defaultdict(list)
+            for p in self.scenario.profilesOfSize(size):
+                orbits[p.canonicalForm()[0]].append(p)
+
+            for orbit in orbits.values():
+                # For all two unordered pairs of profiles of this orbit, construct the mapping, and make the
+                # corresponding instance.
                 # IMPORTANT! We are not generating the inverse, but this is fine, because we consider the two equal
                 # (the inverse is from q to p). Check __equal__() to see that indeed they are equal!
-                mapping = self._getMappingIfPermutable(p, q)
-                if mapping is not None:
-                    insts.add(NeutralityInstance(p, mapping, q))
+                for p, q in combinations(orbit, 2):
+                    insts.add(NeutralityInstance(p, self._getMappingIfPermutable(p, q), q))
         return insts
 
+    def iterInstancesOfRanks(self, start, stop):
+        # The instances of getInstances, each owned by the profile of least rank (the first one of its pair).
+        for rank in range(start, stop):
+            p = self.scenario.unrankProfile(rank)
+            table = p._table
+            # The profiles of the orbit of p coming after it.
+            orbit = {table.rename(p.counts, relabelling) for _, relabelling in table.renamings}
+            later = [q for q in (model.AnonymousProfile.from_counts(table, counts) for counts in orbit)\
+                if self.scenario.rankProfile(q) > rank]
+            for q in sorted(later, key=self.scenario.rankProfile):
+                yield NeutralityInstance(p, self._getMappingIfPermutable(p, q), q)
+
+    def iterInstancesUpToRenaming(self, representatives):
+        # Renaming the alternatives, every instance becomes one mapping a representative into itself.
+        for profile in representatives:
+            for mapping in profile.automorphisms()[1:]:
+                yield NeutralityInstance(profile, mapping, profile)
+
     def getInstancesMentioning(self, profile):
+        table = profile._table
         ballot = profile.anyBallot()
         result = set()
         # Generate all permutations of a ballot:
@@ -409,11 +485,9 @@ class Neutrality(InterprofileAxiom):
             if ballot != perm:
                 # Construct the corresponding mapping.
                 mapping = {b:c for b, c in zip(ballot, perm)}
-                # With it, construct the new profile.
-                new_profile_dict = {}
-                for bballot, count in profile.ballotsWithCounts():
-                    new_profile_dict[model.AnonymousPreference(mapping[b] for b in bballot)] = count
-                new_profile = model.AnonymousProfile(new_profile_dict)
+                # With it, construct the new profile, relabelling the count vector.
+                _, relabelling = table.renamings[table.renamingIndex(mapping)]
+                new_profile = model.AnonymousProfile.from_counts(table, table.rename(profile.counts, relabelling))
 
                 # Add the corresponding instance.
                 result.add(NeutralityInstance(profile, mapping, new_profile))
@@ -513,6 +587,8 @@ class NeutralityInstance(Instance):
 
     """Instance of the `Cancellation` axiom."""
 
+    __slots__ = ('_base', '_mapping', '_mapped', '_profiles', '_key', '_SATarrays', 'created_by')
+
     class HashableDict(dict):
 
         """Private class that represents a hashable dictionary. Used to hash this instance, since a mapping is a dictionary."""
@@ -625,6 +701,25 @@ class NeutralityInstance(Instance):
     def _hashable(self):
         return self._profiles, self._mapping
 
+    def _pack(self, scenario):
+        # The instance is the same from either profile (see _isEqual): we pack it from the profile of least rank.
+        table = self._base._table
+        (low, lowRank), (high, highRank) = sorted(((self._base, scenario.rankProfile(self._base)),\
+            (self._mapped, scenario.rankProfile(self._mapped))), key = lambda pair: pair[1])
+        mapping = self._mapping if low is self._base else {y : x for x, y in self._mapping.items()}
+        forward = table.renamingIndex(mapping)
+        backward = table.renamingIndex({y : x for x, y in mapping.items()})
+        # The inverse mapping gives an equal instance: if it maps low into high too, we take the least of the two.
+        if table.rename(low.counts, table.renamings[backward][1]) == high.counts:
+            forward = min(forward, backward)
+        return (lowRank, highRank, forward)
+
+    @classmethod
+    def _unpack(cls, scenario, packed):
+        base, mapped, mapping = packed
+        base, mapped = scenario.unrankProfile(base), scenario.unrankProfile(mapped)
+        return cls(base, base._table.renamings[mapping][0], mapped)
+
     def __str__(self):
         return f"Profiles ({self._base}) and ({self._mapped}) are identical up to a renaming of the alternatives: {self._mapping}. Hence, the outcomes must be equal under the same renaming."
 
@@ -632,151 +727,73 @@ class PositiveResponsiveness(InterprofileAxiom):
 
     """Axiom encoding the fact that if a (possibly tied) alternative receives increased support, then it must be the unique winner."""
 
-    def _remove_alt_data(self, profile, x):
-        """Clean a profile from an alternative.
-
-        Will return two dictionaries: one mapping every cleaned ballot B to the list
-        of ballots that, if we remove x from it, we obtain B.
-        One mapping every cleaned ballot B to the total number of voters whose cleaned
-        ballot is B."""
-        counts, ballots = {}, {}
+    neutral = True
+
+    def _raisedPositions(self, positions: list) -> Iterator[tuple]:
+        """Given the (sorted) positions of an alternative in some ballots, yield every way of raising it in these ballots.
+
+        These are the non-decreasing sequences c_1 <= ... <= c_k with 1 <= c_i <= positions[i]: the new positions can be
+        paired to the old ones so that no position gets worse if and only if this holds. The first sequence is positions
+        itself (nothing is raised)."""
+        if not positions:
+            yield ()
+            return
+        # We fix the last position, starting from the current one, and raise the others at most as much.
+        *rest, last = positions
+        for raised in self._raisedPositions(rest):
+            for c in range(last, (raised[-1] if raised else 1) - 1, -1):
+                yield raised + (c,)
+
+    def _raisings(self, profile, x) -> Iterator:
+        """Yield every profile obtained from `profile` by raising the support of x (each exactly once).
+
+        Ballots are grouped by the ballot obtained by removing x from them: raising x in a ballot does not change
+        this, so, for every group, we choose new positions for x among those obtained by raising it (see _raisedPositions)."""
+        table = profile._table
+        # For every cleaned ballot (ballot without x), the positions of x in the ballots of the group.
+        groups = defaultdict(list)
         for ballot, count in profile.ballotsWithCounts():
-            # Remove x.
-            cleaned = model.AnonymousPreference(y for y in ballot if x != y)
-
-            if not cleaned in ballots:
-                ballots[cleaned] = []
-            ballots[cleaned].extend([ballot] * count)
-
-            if not cleaned in counts:
-                counts[cleaned] = 0
-            counts[cleaned] += count
-
-        return counts, ballots        
-
-    def _check_profs(self, p, q):
-        """Check whether between two profiles there are instances of Positive Responsiveness.
-
-        For each instance that exists between p and q,
-        return a tuple of form (base, raised, x). Here, `base` is a profile (p or q) such that,
-        by raising the support of x, we obtain `raised` (again, p or q). We return a list of such
-        tuples."""
-
-        results = []
-
-        # The two profiles must be distinct.
-        if p != q:
-            # Let us try all alternatives, and see if, for one of them,
-            # we find an instance.
-            for x in self.scenario.alternatives:
-                # This function removes "x" from the alternatives of these profiles;
-                # p_ballots maps each "cleaned" ballot B to a set of ballots B' of p such that,
-                # by removing x from B', we obtain B. p_counts counts for every cleaned ballot B
-                # the *total* number of voters such that, if you remove x from their ballot, you
-                # obtain B.
-                p_counts, p_ballots = self._remove_alt_data(p, x)
-                q_counts, q_ballots = self._remove_alt_data(q, x)
-                # To be an instance of PosRes, everything else besides x must be
-                # equal.
-                if p_counts == q_counts:
-                    # Now, we have to do the following. For every cleaned ballot B,
-                    # the sets of ballots in p_ballots[B] and q_ballots[B] only differ in 
-                    # where x is ranked. We need to pair every ballot in p_ballots[B]
-                    # to a ballot in q_ballots[B] such that the rank of x 
-                    # is the same or has been increased for one of the two (and the direction
-                    # of the increase must always be the same, i.e., always p or always q).
-                    # If we can do this for every cleaned ballot B, then we we succeeded.
-
-                    # Initially, we don't know if p is the profile where the support
-                    # of x has increased or if q is.
-                    direction = 'unk'
-
-                    # Hence, for every set of cleaned ballot (note that these are equal for p and q)...
-                    for ballot in p_ballots:
-
-                        # To make the pairings, we keep the ballots from p fixed,
-                        # and try every permutations of the ballots from q.
-
-                        # Recall that, given a cleaned ballot B, p_ballots[B] contains
-                        # the list of ballots such that, if you remove x, you get B.
-                        p_list = p_ballots[ballot]  # this is a list.
-                        for q_list in permutations(q_ballots[ballot]):
-
-                            # This will be explained later...
-                            failed = False
-                            direction_old = direction
-
-                            # We pair each ballots (recall that we try every permutation of q_list)
-                            for p_ballot, q_ballot in zip(p_list, q_list):
-                                # We don't know yet, so we check.
-                                if direction == 'unk':
-                                    # If the rank of x is lower in p than in q,
-                                    # then the support of x has increased in p from q.
-                                    if p_ballot.rank(x) < q_ballot.rank(x):
-                                        direction = 'p raises q'
-                                    # Other direction
-                                    elif p_ballot.rank(x) > q_ballot.rank(x):
-                                        direction = 'q raises p'
-                                    # Else, we can't say anything. Still `unk`.
-                                # If we do know something,
-                                else:
-                                    # If the rank in p is greater AND this contradicts
-                                    # what we have seen so far, we have failed.
-                                    if p_ballot.rank(x) > q_ballot.rank(x) and\
-                                        direction == 'p raises q':
-                                            failed = True
-                                            break
-                                    if p_ballot.rank(x) < q_ballot.rank(x) and\
-                                        direction == 'q raises p':
-                                            failed = True
-                                            break
-
-                            # If we failed, we reset direction to direction_old, i.e., before
-                            # trying the mapping;
-                            # this means that, if we were in state `unk` before trying this mapping,
-                            # we are still in that state.
-                            if failed:
-                                direction = direction_old
-                            # If we did not fail, this mapping works; hence we break, and return to the outer
-                            # loop.
-                            if not failed:
-                                break
-
-                        # If this is the case, it means we tried every mapping, and
-                        # failed all of them (otherwise, we would have broken out without failure
-                        # before). Hence we break out from this loop as well, there is no
-                        # use in trying out the next ballot.
-                        if failed:
-                            break
-
-                    # If we got to here without every failing,
-                    # then we do know the direction, and can create
-                    # the result accordingly.
-                    if direction == 'p raises q':
-                        results.append((q, p, x))
-                    elif direction == 'q raises p':
-                        results.append((p, q, x))
-
-        return results
+            groups[tuple(y for y in ballot if y != x)].extend([ballot.rank(x)] * count)
+
+        # For every group, the ranks of the ballots obtained for every choice of new positions.
+        choices = []
+        for cleaned, positions in groups.items():
+            positions.sort()
+            choices.append([tuple(table.rank[cleaned[:c-1] + (x,) + cleaned[c-1:]] for c in raised)\
+                for raised in self._raisedPositions(positions)])
+
+        # The first choice of every group leaves it unchanged, so we skip the first combination (the profile itself).
+        combined = product(*choices)
+        next(combined)
+        for combination in combined:
+            counts = [0] * len(table.preferences)
+            for ranks in combination:
+                for r in ranks:
+                    counts[r] += 1
+            yield model.AnonymousProfile.from_counts(table, tuple(counts))
 
     def getInstances(self):
         insts = set()
         # Of course, if we only have one alternative, there are no instances (no increase possible)
         if len(self.scenario.alternatives) > 1:
-            # Then, for every possible size of profiles.
-            for size in range(1, self.scenario.nVoters+1):
-                # We get all (unordered) pairs of profiles of the same size
-                # (we can have an instance only between profiles of the same size).
-                for p, q in combinations(self.scenario.profilesOfSize(size), 2):
-                    # If there is an instance between p and q, this will return a tuple
-                    # (base, raised, x), where the support of x in base has been augmented
-                    # to obtain raised. Otherwise, returns None.
-                    for base, raised, x in self._check_profs(p, q):
-                        # If we found an instance, create it!
+            # Instead of comparing all pairs of profiles, we construct, for every profile and alternative x,
+            # all profiles where the support of x has been raised. Each of them gives an instance (exactly once).
+            for base in self.scenario.profiles:
+                for x in self.scenario.alternatives:
+                    for raised in self._raisings(base, x):
                         insts.add(PositiveResponsivenessInstance(base, x, raised))
 
         return insts
 
+    def iterInstancesOfRanks(self, start, stop):
+        # Every instance is owned by the profile whose support is raised.
+        if len(self.scenario.alternatives) > 1:
+            for rank in range(start, stop):
+                base = self.scenario.unrankProfile(rank)
+                for x in self.scenario.alternatives:
+                    for raised in self._raisings(base, x):
+                        yield PositiveResponsivenessInstance(base, x, raised)
+
     def getInstancesMentioning(self, profile):
         raise NotImplementedError("Implement me!")
 
@@ -866,6 +883,8 @@ class PositiveResponsivenessInstance(Instance):
 
     """Instance of the `Positive Responsiveness` axiom."""
 
+    __slots__ = ('_base', '_alternative', '_raised', '_profiles', '_SATarrays', 'created_by')
+
     def __init__(self, base, alternative, raised):
         self._base = base
         self._alternative = alternative
@@ -913,6 +932,15 @@ class PositiveResponsivenessInstance(Instance):
     def _hashable(self):
         return self._profiles, self._alternative
 
+    def _pack(self, scenario):
+        return (scenario.rankProfile(self._base), self._base._table.altIndex[self._alternative], scenario.rankProfile(self._raised))
+
+    @classmethod
+    def _unpack(cls, scenario, packed):
+        base, alternative, raised = packed
+        base = scenario.unrankProfile(base)
+        return cls(base, base._table.order[alternative], scenario.unrankProfile(raised))
+
     def __str__(self):
         return f"In profile ({self._raised}) alternative {self._alternative} gained support relative to profile ({self._base}). Hence, if {self._alternative} wins in the latter, it must be the only winner in the former."
 
@@ -920,128 +948,60 @@ class Reinforcement(InterprofileAxiom):
 
     """Axiom encoding a consistency condition."""
 
+    neutral = True
+
     def getInstances(self):
+        return set(self.iterInstances())
+
+    def iterInstances(self, executor = None):
+
+        if executor is not None:
+            yield from super().iterInstances(executor)
+            return
 
         # Idea: for all (unordered!) pairs of numbers i,j in [1..n-1] (where n is the number of voters),
         # we sum all profiles of i and j voters to obtain a superprofile, and generate the corresponding instance.
-
-        insts = set()
+        # The superprofile and the two subprofiles determine each other, so, if we take every unordered pair of
+        # subprofiles once (ordered by rank), we never generate the same instance twice and we need not store them.
 
         n = self.scenario.nVoters
 
         # Loop over all pair of numbers:
         for n1 in range(1, n//2 + 1):
             for n2 in range(n1, n - n1 + 1):
-                # Loop over all profiles of these sizes.
-                for p1 in self.scenario.profilesOfSize(n1):
-                    for p2 in self.scenario.profilesOfSize(n2):
+                # Loop over all profiles of these sizes (for equal sizes, only the second one can come later).
+                for i, p1 in enumerate(self.scenario.profilesOfSize(n1)):
+                    for p2 in islice(self.scenario.profilesOfSize(n2), i if n1 == n2 else 0, None):
                         # Get the superprofile and instance.
-                        p = p1.mergeProfile(p2)
-                        insts.add(ReinforcementInstance(p, p1, p2))
+                        yield ReinforcementInstance(p1.mergeProfile(p2), p1, p2)
 
-        return insts
-
-    def _auxBinaryPartitions(self, acc, rest):
-
-        """Auxiliary function to generate all binary partitions of a profile.
-
-            This is a tail-recursive function. That is, we use the 'acc' (accumulator) variable to hold the result of the recursion so far,
-            and then finally return it at the end.
-
-            Parameters
-            ----------
-            acc : list
-                The results of the recursion so far. Every element of the list corresponds to a possible way to partition the profile, and is a pair where:
-                    The first element describes the partition. It is a list of tuples (ballot, X, Y). In the original profile, "ballot" was expressed by X+Y voters, and
-                        in this partition we split X of them into the first subprofile, and Y of them in the second one.
-                    The second is a boolean, saying whether this partition is symmetric or not (that is, whether if we swap the first and second subprofile, we obtain the same partition).
-                        This is useful for performance reasons.
-            rest : list
-                The rest of the ballots to process. It is a list of tuples, where each tuple has form (AnonymousPreference, int) (that is, a ballot and the number of voters who cast it).
-
-            Returns
-            -------
-            list
-                A list of the same form of the "acc" argument.
-        """
-
-        # Get the next ballot to process.
-        ballot, counter = rest[0]
-
-        # If acc is nonempty:
-        if acc:
-            acc_new = []
-            # `split` iterates over all possible ways to split counter (the number of voters expressing this ballot) in two numbers.
-            for split in range(counter // 2 + 1):
-
-                # Are we splitting this number in two equal partitions (useful for optimisation)?
-
-                isSymmetric = (split == counter - split)
-
-                # For every possible (incomplete) partition,
-
-                for possible_world, isSymmetricPrime in acc:
-                    # Add this way of splitting this ballot to this partition, and check whether it is symmetric (this number and the rest must be)
-
-                    acc_new.append((possible_world + [(ballot, split, counter - split)], isSymmetric and isSymmetricPrime))
-                    # If this (new) way of splitting and the incomplete partition are both non-symmetric, we also have to add the opposite way to splitting the 
-                    # current ballot.
-                    if not isSymmetric and not isSymmetricPrime:
-                        acc_new.append((possible_world + [(ballot, counter - split, split)], False))
-
-        # If it is empty, it is the first turn.
-        else:
-            # Hence, 
-            acc_new = [([(ballot, split, counter - split)], split == counter - split) for split in range(counter // 2 + 1)]
-
-
-        if rest[1:]:
-            return self._auxBinaryPartitions(acc_new, rest[1:])
-        else:
-            return acc_new
+    def iterInstancesOfRanks(self, start, stop):
+        # Every instance is owned by its superprofile: splitting it in two gives each of its instances once.
+        # Subprofiles recur across superprofiles: we keep one object for each, so that its rank is computed once.
+        subprofiles = {}
+        for rank in range(start, stop):
+            profile = self.scenario.unrankProfile(rank)
+            for first, second in self._binaryPartitions(profile):
+                yield ReinforcementInstance(profile, subprofiles.setdefault(first, first), subprofiles.setdefault(second, second))
 
     def _binaryPartitions(self, profile):
 
         """Return all pairs of subprofiles of the input profile.
 
-                    Parameters
+            Parameters
             ----------
             profile : AnonymousProfile
                 The profile to split.
 
             Returns
             -------
-            set
-                A set of pair of profiles.
+            Iterator
+                An iterator over pairs of profiles (each unordered pair exactly once).
             """
 
-        # See the docs for this function.
-        partitions = self._auxBinaryPartitions([], list(profile.ballotsWithCounts()))
-
-        result = set()
-        # 'partition` contains, for every ballot, the number of voters for the first and the second subprofiles who get this ballot.'
-        for partition, _ in partitions:
-
-            # The two subprofiles dictionaries.
-            left_partition, right_partition = {}, {}
-
-            # This is just to check whether the profile has at least one voter.
-            l1, l2 = 0, 0
-
-            for ballot, c1, c2 in partition:
-                l1 += c1
-                l2 += c2
-                if c1 > 0:
-                    left_partition[ballot] = c1
-                if c2 > 0:
-                    right_partition[ballot] = c2
-
-            if l1 > 0 and l2 > 0:
-                profile1 = model.AnonymousProfile(dict(left_partition))
-                profile2 = model.AnonymousProfile(dict(right_partition))
-                result.add((profile1, profile2))
-
-        return result
+        table = profile._table
+        for left, right in table.splitCounts(profile.counts):
+            yield model.AnonymousProfile.from_counts(table, left), model.AnonymousProfile.from_counts(table, right)
 
     def _auxGenerateInstances(self, profile, sizeOfBallotsToAdd : int):
 
@@ -1103,6 +1063,8 @@ class ReinforcementInstance(Instance):
 
     """Instance of the `Reinforcement` axiom."""
 
+    __slots__ = ('_profile', '_part1', '_part2', '_profiles', '_SATarrays', 'created_by')
+
     def __init__(self, p, p1, p2):
         self._profile = p
         self._part1, self._part2 = p1, p2
@@ -1122,6 +1084,14 @@ class ReinforcementInstance(Instance):
     def _hashable(self):
         return self._profiles
 
+    def _pack(self, scenario):
+        # The subprofiles are unordered (see _isEqual).
+        return (scenario.rankProfile(self._profile), *sorted((scenario.rankProfile(self._part1), scenario.rankProfile(self._part2))))
+
+    @classmethod
+    def _unpack(cls, scenario, packed):
+        return cls(*map(scenario.unrankProfile, packed))
+
     def as_SAT(self, encoding):
         cnf = []
 
@@ -1146,6 +1116,26 @@ class ReinforcementInstance(Instance):
 
         return cnf
 
+    def as_compact_SAT(self, encoding):
+        cnf = []
+
+        # Auxiliary variable: the intersection of the outcomes of the subprofiles is non-empty. We only force it
+        # to be true if some alternative wins in both; making it false otherwise is always possible, since it
+        # only appears in this instance. It is identified by the packed instance, so equal instances share it.
+        nonEmpty = encoding.auxiliary(('Reinforcement', *self._pack(encoding.scenario)))
+
+        for x in self._profile.alternatives:
+            literal = encoding.encode(self._profile, x)
+            part1, part2 = encoding.encode(self._part1, x), encoding.encode(self._part2, x)
+            # If x wins in both subprofiles, it wins in the superprofile, and the intersection is non-empty.
+            cnf.append([-part1, -part2, literal])
+            cnf.append([-part1, -part2, nonEmpty])
+            # If the intersection is non-empty and x wins in the superprofile, then x wins in both subprofiles.
+            cnf.append([-nonEmpty, -literal, part1])
+            cnf.append([-nonEmpty, -literal, part2])
+
+        return cnf
+
     def as_asp(self, encoding):
         p1, p2 = map(encoding.encode_profile, sorted((self._part1, self._part2)))
         p = encoding.encode_profile(self._profile)
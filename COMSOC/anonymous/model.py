@@ -2,21 +2,20 @@ from COMSOC.interfaces.model import AbstractScenario, AbstractProfile
 from COMSOC.voting.model import VotingOutcome, VotingPreference
 from COMSOC.anonymous.rules import AnonymousRule
 
-from typing import Dict, Iterator, List, Callable, Set
+from typing import Dict, Iterator, List, Set
 
-from COMSOC.helpers import powerset, merge_dicts
-from itertools import permutations, combinations
-from collections import defaultdict, Counter
+from COMSOC.helpers import powerset
+from itertools import permutations, combinations, combinations_with_replacement
+from collections import Counter
+from operator import add
 
-from math import factorial
-from scipy.special import comb
+from math import comb
 
-from COMSOC.voting.encodings import SATEncodingHandler, ASPEncodingHandler
+from COMSOC.voting.encodings import RankedSATEncodingHandler, NeutralSATEncodingHandler, ASPEncodingHandler
 
 class AnonymousScenario(AbstractScenario):
     """Class representing an anonymous voting scenario"""
 
-    SATencoding = SATEncodingHandler()
     ASPencoding = ASPEncodingHandler()
 
     @classmethod
@@ -53,21 +52,31 @@ class AnonymousScenario(AbstractScenario):
         
         return profile_dict
 
-    def __init__(self, nVoters: int, alternatives: Iterator):
+    def __init__(self, nVoters: int, alternatives: Iterator, cacheProfiles: bool = True, store: str = None):
         self._nVoters = nVoters
         self._alternatives = frozenset(alternatives)
+        # Numbering of the preferences, used to represent profiles as count vectors.
+        self._table = _PreferenceTable.of(self._alternatives)
+        # SAT variables are computed from the rank of the profile, so every scenario has its own encoding.
+        self.SATencoding = RankedSATEncodingHandler(self)
+        # Encoding up to renaming the alternatives, used by reasoners when Neutrality holds (see canonicalProfile).
+        self.neutralSATencoding = NeutralSATEncodingHandler(self)
 
         # This stores all profiles by length (used to avoid generating profiles twice; we sacrifice
-        # memory for time).
+        # memory for time). With cacheProfiles=False, profiles are streamed instead and nothing is stored.
+        self._cacheProfiles = cacheProfiles
         self._profilesByLength = {}
+        # Representatives of the profiles up to renaming the alternatives, by count vector (see canonicalProfile).
+        self._representatives = {}
+        # Optional directory in which the profiles and their properties are stored as memory-mapped files,
+        # shared by all processes using this scenario (see COMSOC.anonymous.properties).
+        self._store = store
     
     @property
     def nProfiles(self) -> int:
         """Return the number of profiles in this scenario."""
-        m = len(self.alternatives)
-        sub_count = lambda n : comb(n+factorial(m)-1, n)
-
-        return sum(sub_count(k) for k in range(1, self.nVoters+1))
+        # The profiles with up to n voters are exactly those ranked below the first profile with n+1 voters.
+        return self._table.sizeOffset(self.nVoters + 1)
 
     @property
     def nVoters(self):
@@ -101,6 +110,24 @@ class AnonymousScenario(AbstractScenario):
         """
         return AnonymousProfile(self._profileDictFromString(description))
 
+    def rankProfile(self, profile) -> int:
+        """Return the rank of a profile, i.e., its position in the enumeration of all profiles.
+
+        Profiles are ordered by number of voters, and profiles with the same number of voters are ordered
+        like `itertools.combinations_with_replacement` lists the multisets of preferences. The first profile
+        has rank 0 and the last one has rank nProfiles - 1."""
+        if profile._rank is None:
+            profile._rank = self._table.rankCounts(profile.counts)
+        return profile._rank
+
+    def unrankProfile(self, rank: int):
+        """Return the profile of a given rank (inverse of rankProfile)."""
+        if not 0 <= rank < self.nProfiles:
+            raise ValueError(f"There is no profile of rank {rank} in this scenario.")
+        profile = AnonymousProfile.from_counts(self._table, self._table.unrankCounts(rank))
+        profile._rank = rank
+        return profile
+
     def get_profile_from_file(self, files):
         """ Given a filename (string) or filenames (list of string), read the profiles in it.
             This function expects an endline-separated list of profiles (encoded as specified in the get_profile method),
@@ -122,11 +149,27 @@ class AnonymousScenario(AbstractScenario):
 
         
 
-    def _generateProfilesOfSize(self, n: int):
+    def _iterCountsOfSize(self, n: int) -> Iterator:
+        """Yield the count vector of every profile with exactly n voters exactly once, in rank order.
+
+        A profile with n voters is a multiset of n preferences, so we list the combinations with replacement
+        of the ranked preferences and turn each of them into a count vector."""
+
+        if not 1 <= n <= self.nVoters:
+            raise Exception(f"This scenario only has {self.nVoters}, but you tried generating profiles for {n}.")
+
+        nPreferences = len(self._table.preferences)
+        for combination in combinations_with_replacement(range(nPreferences), n):
+            counts = [0] * nPreferences
+            for i in combination:
+                counts[i] += 1
+            yield tuple(counts)
+
+    def _iterProfilesOfSize(self, n: int) -> Iterator:
         """Auxilliary function used to generate all profiles.
 
-            In this function, we initialise the value of dictionary _profilesByLength in n.
-            It works recursively by adding all possible ballots to all possible profiles with (n-1) voters.
+            Yield every profile with exactly n voters exactly once, in rank order (see rankProfile). If this
+            scenario has a store, the count vectors are read from it; otherwise, they are generated.
 
             Parameters
             ----------
@@ -135,44 +178,42 @@ class AnonymousScenario(AbstractScenario):
 
             Returns
             -------
-            None
+            Iterator over profiles
         """
 
-        # TODO: make it online, that is, yield profiles as you create them. Problem: make it work with the other function that call this one.
-
-        # If we have only one voter, we just return the dictionaries corresponding to all singleton profiles.
-        if n == 1:
-            newProfiles = {AnonymousProfile({preference: 1}) for preference in self.preferences}
-        elif n <= self.nVoters:
-            # Recursive call with n-1 voters. With this, we can obtain all profiles with n voters
-            # by just adding one ballot (for every possible ballot) to every profile with n-1 voters.
-            smallerProfiles = self.profilesOfSize(n-1)
-            newProfiles = set()
-            # For every profile with n-1 voters and for every possible preference, add this preference to the profile.
-            for profile in smallerProfiles:
-                for preference in self.preferences:
-                    pdict = profile.as_dict()
-                    if preference in pdict:
-                        pdict[preference] += 1
-                    else:
-                        pdict[preference] = 1
-                    # Add the resulting profile to the bunch.
-                    newProfiles.add(AnonymousProfile(pdict))
+        table = self._table
+        # We know the rank of the profiles as we generate them: no need to compute it later.
+        rank = table.sizeOffset(n)
+
+        if self._store is None:
+            allCounts = self._iterCountsOfSize(n)
         else:
-            raise Exception(f"This scenario only has {self.nVoters}, but you tried generating profiles for {n}.")
+            if not 1 <= n <= self.nVoters:
+                raise Exception(f"This scenario only has {self.nVoters}, but you tried generating profiles for {n}.")
+            allCounts = map(tuple, self.propertyTable.counts[rank:table.sizeOffset(n+1)].tolist())
+
+        for counts in allCounts:
+            profile = AnonymousProfile.from_counts(table, counts)
+            profile._rank = rank
+            rank += 1
+            yield profile
+
+    def profilesOfSize(self, n: int) -> Iterator:
 
-        self._profilesByLength[n] = newProfiles
+        """Return all profiles with exactly n voters, in rank order.
 
-    def profilesOfSize(self, n: int) -> Set:
+        If this scenario caches profiles, they are generated once and stored (we sacrifice memory for time);
+        otherwise, they are streamed every time."""
 
-        """Return the set of all profiles with exactly n voters."""
+        if not self._cacheProfiles:
+            return self._iterProfilesOfSize(n)
 
         # If we have already generated the profiles with exactly n voters, we return that.
         try:
             return self._profilesByLength[n]
         # Otherwise, we initalise that, and return it.
         except KeyError:
-            self._generateProfilesOfSize(n)
+            self._profilesByLength[n] = tuple(self._iterProfilesOfSize(n))
             return self._profilesByLength[n]
 
     def profilesUpToSize(self, n: int) -> Iterator:
@@ -186,35 +227,66 @@ class AnonymousScenario(AbstractScenario):
         """Return all profiles in this scenario."""
         return self.profilesUpToSize(self.nVoters)
 
+    @property
+    def propertyTable(self):
+        """Return the majority-based properties of all profiles in this scenario (see COMSOC.anonymous.properties).
+
+        The table is computed the first time it is needed or, if this scenario has a store, attached from it."""
+        if not hasattr(self, '_propertyTable'):
+            # Imported here, so that only the code using the table needs NumPy.
+            from COMSOC.anonymous.properties import PropertyTable
+            if self._store is None:
+                self._propertyTable = PropertyTable(self)
+            else:
+                self._propertyTable = PropertyTable.attach(self, self._store)
+        return self._propertyTable
+
     @property
     def preferences(self) -> Iterator:
         """Return all possible preference orders for this scenario."""
-        return {AnonymousPreference(perm) for perm in permutations(self.alternatives)}
+        return set(self._table.preferences)
 
     @property
     def outcomes(self) -> Iterator:
         """Return all possible voting outcomes for this scenario."""
         return {AnonymousOutcome(outcome) for outcome in powerset(self.alternatives) if outcome}
 
-    def decodeSATModel(self, model: List[int]) -> dict:
+    def canonicalProfile(self, profile) -> tuple:
+        """Return the representative of a profile up to renaming the alternatives, and the renaming mapping the profile into it.
+
+        The representative is the profile whose count vector is the canonical form of the profile (see AnonymousProfile.canonicalForm)."""
+        counts, mapping = profile.canonicalForm()
+        # Representatives are stored (one for every orbit), so that their rank is computed once.
+        try:
+            return self._representatives[counts], mapping
+        except KeyError:
+            representative = self._representatives[counts] = AnonymousProfile.from_counts(self._table, counts)
+            return representative, mapping
+
+    @property
+    def canonicalProfiles(self) -> Iterator:
+        """Return an iterator over the representatives of the profiles up to renaming the alternatives (see canonicalProfile)."""
+        return (profile for profile in self.profiles if profile.canonicalForm()[0] == profile.counts)
+
+    def decodeSATModel(self, model: List[int], encoding = None) -> dict:
         """Given a SAT model (list of non-zero integers), return a SCF that
-        is consistent with this model."""
-
-        # Dictionary from profiles to set of alternatives, representing the possible winner.
-        # By default, we return all alternatives.
-        possibleWinners = defaultdict(lambda : set(self.alternatives))
-        # For every literal, if that literal is negative, we remove
-        # the corresponding alternative from the possible winners of the corresponding profile.
-        for literal in model:
-            if literal < 0:
-                profile, alt = self.SATencoding.decode(literal)
-                possibleWinners[profile].remove(alt)
-            # If it is positive, nothing to do: we already have all possible winners there.
+        is consistent with this model.
+
+        The model is read in the given encoding (by default, the SAT encoding of this scenario)."""
+
+        if encoding is None:
+            encoding = self.SATencoding
+
+        # The variables that are false in the model (auxiliary variables of compact encodings are never looked up).
+        false = {-literal for literal in model if literal < 0}
+        # An alternative wins in a profile unless its variable is false: by default, all alternatives win.
+        # Outcomes are computed when asked for, so that encodings not giving a variable to every pair (such as
+        # the neutral one) can be decoded as well.
 
         # Alternative: randomise (select random subset of possible winners).
 
         # Return the corresponding function.
-        return AnonymousRule.from_function(lambda p: possibleWinners[p], self)
+        return AnonymousRule.from_function(lambda p: {alt for alt in self.alternatives if encoding.encode(p, alt) not in false}, self)
 
     def __str__(self):
         alt_str = '{' + ', '.join(map(str, sorted(self.alternatives))) + '}'
@@ -222,7 +294,7 @@ class AnonymousScenario(AbstractScenario):
 
     def __getstate__(self):
         """Return the pickling information."""
-        return (self.nVoters, self.alternatives)
+        return (self.nVoters, self.alternatives, self._cacheProfiles, self._store)
 
     def __setstate__(self, tupl):
         """Unpickle the object."""
@@ -236,27 +308,229 @@ class AnonymousScenario(AbstractScenario):
         return hash((self.nVoters, self.alternatives))
 
 class AnonymousPreference(VotingPreference):
-    """Class representing an individual preference in anonymous voting. Identical to a voting preference."""
-    pass
+    """Class representing an individual preference in anonymous voting.
+
+    Preferences are interned: building a preference returns the unique object representing that order of
+    the alternatives, owned by the _PreferenceTable of the alternatives. Its `id` is its rank in the table,
+    and its positions (see VotingPreference.positions) are computed in advance."""
+
+    def __new__(cls, preference):
+        preference = tuple(preference)
+        table = _PreferenceTable.of(preference)
+        try:
+            return table.preferences[table.rank[preference]]
+        except KeyError:
+            raise ValueError(f"{preference} is not an order of the alternatives {set(preference)}.")
 
 class AnonymousOutcome(VotingOutcome):
     """Class representing a possible outcome in anonymous voting. Identical to a voting outcome."""
     pass
 
+class _PreferenceTable:
+    """Private class numbering all preferences over a set of alternatives.
+
+    Preferences are ranked in lexicographic order (the order in which `itertools.permutations` lists the
+    permutations of the sorted alternatives). The rank of a preference is its position in the count vector
+    of a profile. Tables are shared: there is exactly one table for every set of alternatives."""
+
+    _tables = {}
+    # Ways of splitting count vectors in two, by signature (see _splitTable). Shared by all tables.
+    _splitTables = {}
+
+    @classmethod
+    def of(cls, alternatives):
+        """Return the (unique) table of a set of alternatives."""
+        alternatives = frozenset(alternatives)
+        try:
+            return cls._tables[alternatives]
+        except KeyError:
+            table = cls._tables[alternatives] = cls(alternatives)
+            return table
+
+    def __init__(self, alternatives: frozenset):
+        self.alternatives = alternatives
+        # These are the interned preferences: we bypass AnonymousPreference.__new__, which looks them up here.
+        self.preferences = tuple(tuple.__new__(AnonymousPreference, perm) for perm in permutations(sorted(alternatives)))
+        self.rank = {preference: i for i, preference in enumerate(self.preferences)}
+        for i, preference in enumerate(self.preferences):
+            preference.id = i
+            preference._positions = {alt : position for position, alt in enumerate(preference)}
+
+        # Alternatives are numbered in sorted order. The pair (x, y) of the i-th and j-th alternatives has
+        # (flat) index i * m + j in the majority matrix and in the unanimity bitset of a profile.
+        self.order = tuple(sorted(alternatives))
+        self.altIndex = {alt : i for i, alt in enumerate(self.order)}
+        m = len(self.order)
+        # For every preference, the indices of the pairs (x, y) such that x is preferred to y, as a tuple and as a bitset.
+        self.pairs = tuple(tuple(self.altIndex[x] * m + self.altIndex[y] for x, y in combinations(preference, 2))\
+            for preference in self.preferences)
+        self.pairMasks = tuple(sum(1 << pair for pair in pairs) for pairs in self.pairs)
+
+    @property
+    def renamings(self) -> tuple:
+        """Return all renamings of the alternatives, as pairs (mapping, relabelling), the first one being the identity.
+
+        The mapping is a dictionary from alternatives to alternatives; the relabelling is a tuple whose r-th entry
+        is the rank of the preference obtained by renaming the alternatives of the preference of rank r. The
+        renamings are computed the first time they are needed."""
+        if not hasattr(self, '_renamings'):
+            renamings = []
+            for images in permutations(self.order):
+                mapping = dict(zip(self.order, images))
+                relabelling = tuple(self.rank[tuple(mapping[x] for x in preference)] for preference in self.preferences)
+                renamings.append((mapping, relabelling))
+            self._renamings = tuple(renamings)
+            self._renamingIndex = {images : i for i, images in enumerate(permutations(self.order))}
+        return self._renamings
+
+    def renamingIndex(self, mapping: dict) -> int:
+        """Return the index of a mapping (dictionary from alternatives to alternatives) in renamings."""
+        # Make sure that the renamings (and their index) are computed.
+        self.renamings
+        return self._renamingIndex[tuple(mapping[x] for x in self.order)]
+
+    def rename(self, counts: tuple, relabelling: tuple) -> tuple:
+        """Return the count vector obtained by renaming the alternatives of a count vector (see renamings)."""
+        renamed = [0] * len(counts)
+        for r, count in enumerate(counts):
+            if count:
+                renamed[relabelling[r]] = count
+        return tuple(renamed)
+
+    @classmethod
+    def _splitTable(cls, signature: tuple) -> tuple:
+        """Return all ways of splitting positive counts (the signature) in two non-empty parts, up to swapping them.
+
+        The left parts are listed by a mixed-radix counter (the i-th digit ranging from 0 to signature[i]), in
+        lexicographic order. The right part of the k-th left part is the (total-1-k)-th one, where total is the
+        number of left parts: hence, we stop halfway. Tables are computed once per signature, and then stored."""
+        try:
+            return cls._splitTables[signature]
+        except KeyError:
+            total = 1
+            for count in signature:
+                total *= count + 1
+            splits = []
+            left = [0] * len(signature)
+            # Skip the empty left part (first), and the left parts whose right part comes before them.
+            for _ in range((total - 1) // 2):
+                i = len(signature) - 1
+                while left[i] == signature[i]:
+                    left[i] = 0
+                    i -= 1
+                left[i] += 1
+                splits.append((tuple(left), tuple(count - l for count, l in zip(signature, left))))
+            table = cls._splitTables[signature] = tuple(splits)
+            return table
+
+    def splitCounts(self, counts: tuple) -> Iterator:
+        """Yield all ways of splitting a count vector in two non-empty count vectors, as pairs, up to swapping them."""
+        support = [i for i, count in enumerate(counts) if count]
+        for left, right in self._splitTable(tuple(counts[i] for i in support)):
+            leftCounts, rightCounts = [0] * len(counts), [0] * len(counts)
+            for i, l, r in zip(support, left, right):
+                leftCounts[i], rightCounts[i] = l, r
+            yield tuple(leftCounts), tuple(rightCounts)
+
+    def nMultisets(self, n: int) -> int:
+        """Return the number of multisets of n preferences, i.e., the number of profiles with n voters."""
+        return comb(len(self.preferences) + n - 1, n)
+
+    def sizeOffset(self, n: int) -> int:
+        """Return the rank of the first profile with n voters, i.e., the number of profiles with 1 to n-1 voters."""
+        # Hockey-stick identity: sum_{t=0}^{n-1} C(k+t-1, t) = C(k+n-1, n-1), minus the empty profile.
+        return comb(len(self.preferences) + n - 1, n - 1) - 1
+
+    def rankCounts(self, counts: tuple) -> int:
+        """Return the rank of a count vector (see AnonymousScenario.rankProfile).
+
+        Within a size n, we rank the sorted sequence c_1 <= ... <= c_n of preference indices in lexicographic
+        order. The sequences before it are those that agree on c_1, ..., c_{i-1} and have a smaller i-th entry v
+        (with c_{i-1} <= v < c_i); there are C(k-v+r-1, r) of them for each v, with r = n-i the remaining
+        entries. Summing over v telescopes to C(k-c_{i-1}+r, r+1) - C(k-c_i+r, r+1)."""
+        k = len(self.preferences)
+        n = sum(counts)
+        rank = self.sizeOffset(n)
+        r, previous = n, 0
+        for index, count in enumerate(counts):
+            for _ in range(count):
+                r -= 1
+                rank += comb(k - previous + r, r + 1) - comb(k - index + r, r + 1)
+                previous = index
+        return rank
+
+    def unrankCounts(self, rank: int) -> tuple:
+        """Return the count vector of a given rank (inverse of rankCounts)."""
+        k = len(self.preferences)
+        # Find the size of the profile.
+        n = 1
+        while rank >= self.nMultisets(n):
+            rank -= self.nMultisets(n)
+            n += 1
+
+        counts = [0] * k
+        index = 0
+        for r in range(n - 1, -1, -1):
+            # Skip the preferences v whose block of C(k-v+r-1, r) sequences comes before the rank.
+            while rank >= comb(k - index + r - 1, r):
+                rank -= comb(k - index + r - 1, r)
+                index += 1
+            counts[index] += 1
+        return tuple(counts)
+
+    def __reduce__(self):
+        # Unpickling returns the shared table of this process.
+        return (_PreferenceTable.of, (self.alternatives,))
+
 class AnonymousProfile(AbstractProfile):
-    """Class representing an anonymous preference profile."""
+    """Class representing an anonymous preference profile.
+
+    Internally, a profile is a count vector: the i-th entry is the number of voters casting the
+    preference of rank i (see _PreferenceTable). The majority matrix, the unanimity bitset and the
+    properties derived from them are computed the first time they are needed, and then stored."""
+
+    __slots__ = ('_table', '_counts', '_length', '_name', '_rank',\
+        '_majority', '_unanimity', '_condorcetWinner', '_perfectTie', '_paretoDominated', '_canonical')
 
     def __init__(self, preferences: Dict[AnonymousPreference, int]):
-        """Initialise the profile."""
-        self._profile = preferences
-        self._name = ", ".join("#" + str(count) + ":" + str(ballot) for ballot, count in sorted(self._profile.items()))
-        self._length = sum(preferences.values())
-        self._alternatives = frozenset(self.anyBallot())
+        """Initialise the profile from a dictionary mapping ballots to their counts."""
+        table, counts = None, None
+        for ballot, count in preferences.items():
+            if table is None:
+                table = _PreferenceTable.of(ballot)
+                counts = [0] * len(table.preferences)
+            counts[ballot.id] += count
+
+        if table is None:
+            raise ValueError("A profile must contain at least one ballot.")
+
+        self._setCounts(table, tuple(counts))
+
+    @classmethod
+    def from_counts(cls, table: _PreferenceTable, counts: tuple):
+        """Return the profile with the given count vector, without going through a dictionary."""
+        profile = cls.__new__(cls)
+        profile._setCounts(table, counts)
+        return profile
+
+    def _setCounts(self, table, counts):
+        self._table = table
+        self._counts = counts
+        self._length = sum(counts)
+        # The name and the rank are only computed when someone asks for them (see __str__ and
+        # AnonymousScenario.rankProfile).
+        self._name = None
+        self._rank = None
+
+    @property
+    def counts(self) -> tuple:
+        """Return the count vector of this profile."""
+        return self._counts
 
     @property
     def alternatives(self):
         """Return the alternatives of this profile."""
-        return self._alternatives
+        return self._table.alternatives
 
     def top(self):
         """If this profile is a singleton (one voter), return its top-ranked alternative."""
@@ -265,11 +539,13 @@ class AnonymousProfile(AbstractProfile):
 
     def ballotsWithCounts(self) -> Iterator:
         """Return an iterator over tuples of form (ballot : AnonymousPreference, count : int) describing the profile."""
-        return self._profile.items()
+        preferences = self._table.preferences
+        return ((preferences[i], count) for i, count in enumerate(self._counts) if count)
 
     def uniqueBallots(self):
         """Return all unique ballots."""
-        return self._profile.keys()
+        preferences = self._table.preferences
+        return [preferences[i] for i, count in enumerate(self._counts) if count]
 
     def allBallots(self):
         """Return a list of all ballots."""
@@ -284,34 +560,57 @@ class AnonymousProfile(AbstractProfile):
         for b in self.uniqueBallots():
             return b
 
-    def isParetoDom(self, x) -> bool:
-        """Check whether some alternative x is Pareto-domianted."""
+    def _computeMajority(self):
+        """Compute the majority matrix and the unanimity bitset of this profile (see majorityMatrix and unanimity)."""
+        table = self._table
+        majority = [0] * len(table.order) ** 2
+        unanimity = -1
+        for i, count in enumerate(self._counts):
+            if count:
+                for pair in table.pairs[i]:
+                    majority[pair] += count
+                unanimity &= table.pairMasks[i]
+        self._majority = tuple(majority)
+        self._unanimity = unanimity
 
-        # Does y dominated x?
-        for y in self.alternatives:
-            if x != y:
-                # Assume it does...
-                flag = True
-                # Check all (unique ballots)
-                for ballot in self.uniqueBallots():
-                    # If x is preferred to y, we are proved wrong.
-                    if ballot.prefers(x, y):
-                        flag = False
-                        break
-                # If we are never proven wrong, return True!
-                if flag:
-                    return True
-        # We couldn't find any y that Pareto-dominates x.
-        return False
+    @property
+    def majorityMatrix(self) -> tuple:
+        """Return the weighted majority matrix, flattened: entry i * m + j is the number of voters preferring
+        the i-th alternative to the j-th one (alternatives in sorted order)."""
+        try:
+            return self._majority
+        except AttributeError:
+            self._computeMajority()
+            return self._majority
 
+    @property
+    def unanimity(self) -> int:
+        """Return the unanimity bitset: bit i * m + j is set if all voters prefer the i-th alternative to the j-th one."""
+        try:
+            return self._unanimity
+        except AttributeError:
+            self._computeMajority()
+            return self._unanimity
+
+    def paretoDominated(self) -> frozenset:
+        """Return the set of Pareto-dominated alternatives."""
+        try:
+            return self._paretoDominated
+        except AttributeError:
+            order, unanimity, m = self._table.order, self.unanimity, len(self._table.order)
+            # x (j-th alternative) is dominated if some y (i-th alternative) is unanimously preferred to it.
+            self._paretoDominated = frozenset(order[j] for j in range(m)\
+                if any(unanimity >> (i * m + j) & 1 for i in range(m)))
+            return self._paretoDominated
+
+    def isParetoDom(self, x) -> bool:
+        """Check whether some alternative x is Pareto-domianted."""
+        return x in self.paretoDominated()
 
     def majorityContest(self, x, y) -> Set:
-        prefer_x, prefer_y = 0, 0
-        for ballot, count in self.ballotsWithCounts():
-            if ballot.prefers(x, y):
-                prefer_x += count
-            else:
-                prefer_y += count
+        altIndex, majority, m = self._table.altIndex, self.majorityMatrix, len(self._table.order)
+        i, j = altIndex[x], altIndex[y]
+        prefer_x, prefer_y = majority[i * m + j], majority[j * m + i]
 
         if prefer_x > prefer_y:
             return {x}
@@ -321,57 +620,92 @@ class AnonymousProfile(AbstractProfile):
             return {x, y}
 
     def condorcetWinner(self):
-        disproven = set()
-
-        for x in self.alternatives:
-            if x in disproven:
-                continue
-            for y in self.alternatives:
-                if x != y:
-                    winner = self.majorityContest(x, y)
-                    if y in winner:
-                        disproven.add(x)
-                        if x in winner:
-                            disproven.add(y)
-                        break
-                    else:
-                        disproven.add(y)
-            if not x in disproven:
-                return x
+        try:
+            return self._condorcetWinner
+        except AttributeError:
+            majority, m = self.majorityMatrix, len(self._table.order)
+            self._condorcetWinner = None
+            # The Condorcet winner beats every other alternative in a majority contest.
+            for i in range(m):
+                if all(majority[i * m + j] > majority[j * m + i] for j in range(m) if j != i):
+                    self._condorcetWinner = self._table.order[i]
+                    break
+            return self._condorcetWinner
 
     def hasCondorcetWinner(self):
         return not (self.condorcetWinner() is None)
 
     def isPerfectTie(self) -> bool:
         """Check whether this profile is a perfect tie (as defined in the Cancellation axiom)."""
-
-        # Can only happen for profile with an even number of voters.
-        if len(self) % 2 != 0:
-            return False
-
-        # For every (unordered) pair of alternatives x, y
-        for x, y in combinations(self.alternatives, 2):
-            # If they don't tie, this is not a perfectly-tied profile.
-            if len(self.majorityContest(x, y)) < 2:
-                return False
-
-        # We were never proven wrong: return True.
-        return True
+        try:
+            return self._perfectTie
+        except AttributeError:
+            # Can only happen for profile with an even number of voters. Otherwise, all (unordered) pairs
+            # of alternatives x, y must tie.
+            majority, m = self.majorityMatrix, len(self._table.order)
+            self._perfectTie = len(self) % 2 == 0 and\
+                all(majority[i * m + j] == majority[j * m + i] for i, j in combinations(range(m), 2))
+            return self._perfectTie
+
+    def _computeCanonicalForm(self):
+        """Compute the canonical form of this profile, and the indices of all renamings yielding it (see canonicalForm)."""
+        table = self._table
+        support = [(r, count) for r, count in enumerate(self._counts) if count]
+        best, reaching = None, []
+        for i, (_, relabelling) in enumerate(table.renamings):
+            # Count vectors compare like the lists of their non-zero entries, by position, each as (-position, count):
+            # we only rename these entries.
+            renamed = sorted(((-relabelling[r], count) for r, count in support), reverse = True)
+            if best is None or renamed < best:
+                best, reaching = renamed, [i]
+            elif renamed == best:
+                reaching.append(i)
+        counts = [0] * len(self._counts)
+        for position, count in best:
+            counts[-position] = count
+        self._canonical = (tuple(counts), tuple(reaching))
+
+    def canonicalForm(self) -> tuple:
+        """Return the canonical form of this profile with respect to renaming the alternatives.
+
+        This is a pair (counts, mapping): counts is the lexicographically smallest count vector among the renamings
+        of this profile, and mapping (a dictionary from alternatives to alternatives) is the first renaming reaching it.
+        Two profiles are equal up to renaming the alternatives if and only if their canonical count vectors are equal.
+        The canonical form is computed once, and then stored."""
+        try:
+            counts, reaching = self._canonical
+        except AttributeError:
+            self._computeCanonicalForm()
+            counts, reaching = self._canonical
+        return counts, self._table.renamings[reaching[0]][0]
+
+    def automorphisms(self) -> List[dict]:
+        """Return all renamings of the alternatives (as dictionaries) mapping this profile into itself, starting with the identity."""
+        counts, mapping = self.canonicalForm()
+        # If M and M' both map this profile to its canonical form, inverse(M) after M' maps it to itself.
+        inverse = {y : x for x, y in mapping.items()}
+        renamings = self._table.renamings
+        return [{x : inverse[renamings[i][0][x]] for x in mapping} for i in self._canonical[1]]
 
     def mergeProfile(self, other):
         """Merge this profile with another profile from the same scenario."""
-        return AnonymousProfile(merge_dicts(self._profile, other._profile))
+        if self._table is not other._table:
+            raise ValueError("Cannot merge profiles over different alternatives.")
+        return AnonymousProfile.from_counts(self._table, tuple(map(add, self._counts, other._counts)))
 
     def as_dict(self):
         """Returnt this profile as a dictionary mapping ballots to integers."""
-        return dict(self._profile)
+        return dict(self.ballotsWithCounts())
     
     def __str__(self):
+        if self._name is None:
+            # Ballots are listed by rank, which is also their lexicographic order.
+            self._name = ", ".join("#" + str(count) + ":" + str(ballot) for ballot, count in self.ballotsWithCounts())
         return self._name
 
     def prettify(self):
         result = ""
-        for ballot, count in sorted(self._profile.items()):
+        for ballot, count in self.ballotsWithCounts():
             result += "#" + str(count) + ": "
             for alt in ballot:
                 result += '<i>' + alt + '</i> ≻ '
@@ -381,15 +715,19 @@ class AnonymousProfile(AbstractProfile):
 
     def __eq__(self, other):
         """Check whether this profile is the same as another."""
-        return self._profile == other._profile
+        return isinstance(other, AnonymousProfile) and self._counts == other._counts and self._table is other._table
 
     def __hash__(self):
-        return hash(str(self))
+        return hash(self._counts)
+
+    def __reduce__(self):
+        # Only the count vector is pickled: the properties are computed again when needed.
+        return (AnonymousProfile.from_counts, (self._table, self._counts))
 
     def __gt__(self, other):
         """Check lexicographic ordering of two profiles."""
-        return self._name > other._name
+        return str(self) > str(other)
 
     def __len__(self):
         """Return the number of voters."""
-        return self._length
\ No newline at end of file
+        return self._length
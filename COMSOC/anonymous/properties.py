@@ -0,0 +1,114 @@
+from itertools import compress, chain
+from typing import Iterator
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+class PropertyTable:
+    """Majority-based properties of all the profiles of an anonymous scenario, computed with NumPy.
+
+    The count vectors of all profiles form a (profiles x preferences) matrix. Multiplying it by the
+    (preferences x pairs) matrix telling, for every preference, which alternative it prefers in every
+    ordered pair gives the weighted majority matrices of all profiles at once; Condorcet winners, perfect
+    ties and Pareto-dominated alternatives follow with a few array operations.
+
+    Rows follow the rank order of the profiles, i.e., the order of `scenario.profiles`.
+
+    A table can also be stored as memory-mapped files (see `attach`): every process attaching to the same
+    store shares the arrays, instead of generating the profiles and computing their properties again."""
+
+    # Arrays making up the table (and the files of a store).
+    _FIELDS = ('counts', 'margins', 'hasCondorcetWinner', 'condorcetWinner', 'isPerfectTie', 'paretoDominated')
+    # Bump this when the content of the stored arrays changes.
+    _VERSION = 1
+
+    def __init__(self, scenario):
+        self.scenario = scenario
+
+        table = scenario._table
+        m = len(table.order)
+
+        # prefers[r, i * m + j] is 1 if the preference of rank r prefers the i-th alternative to the j-th one.
+        prefers = np.zeros((len(table.preferences), m * m), dtype=np.int32)
+        for r, pairs in enumerate(table.pairs):
+            prefers[r, list(pairs)] = 1
+
+        # We generate the count vectors directly, since the scenario might read its profiles from this table.
+        allCounts = chain.from_iterable(scenario._iterCountsOfSize(n) for n in range(1, scenario.nVoters + 1))
+        self.counts = np.array(list(allCounts), dtype=np.uint8 if scenario.nVoters < 256 else np.int32)
+        sizes = self.counts.sum(axis=1)
+
+        # majority[p, i, j] is the number of voters of the p-th profile preferring the i-th alternative to the j-th one.
+        majority = (self.counts @ prefers).reshape(-1, m, m)
+        self.margins = majority - majority.transpose(0, 2, 1)
+
+        # The i-th alternative is the Condorcet winner if its margin against every other alternative is positive.
+        wins = ((self.margins > 0) | np.eye(m, dtype=bool)).all(axis=2)
+        self.hasCondorcetWinner = wins.any(axis=1)
+        self.condorcetWinner = wins.argmax(axis=1)
+
+        # All margins are zero (this implies an even number of voters).
+        self.isPerfectTie = ~self.margins.any(axis=(1, 2))
+
+        # The j-th alternative is dominated if all voters prefer some i-th alternative to it.
+        self.paretoDominated = (majority == sizes[:, None, None]).any(axis=1)
+
+    @classmethod
+    def _storeName(cls, scenario) -> str:
+        """Return the name of the directory storing the table of a scenario, determined by (nVoters, alternatives)."""
+        digest = hashlib.sha1(repr(scenario._table.order).encode()).hexdigest()
+        return f"anonymous-v{cls._VERSION}-{scenario.nVoters}-{digest}"
+
+    @classmethod
+    def attach(cls, scenario, directory: str):
+        """Return the table of a scenario, backed by read-only memory-mapped files in the given directory.
+
+        If the store does not have the table yet, it is computed and written first. Writing is atomic: the
+        files are written in a temporary directory, which is then renamed, so that other processes never see
+        a partial table (if two processes race, the first rename wins)."""
+        path = os.path.join(directory, cls._storeName(scenario))
+
+        if not os.path.isdir(path):
+            os.makedirs(directory, exist_ok=True)
+            computed = cls(scenario)
+            temporary = tempfile.mkdtemp(dir=directory, prefix='.tmp-')
+            for field in cls._FIELDS:
+                np.save(os.path.join(temporary, field + '.npy'), getattr(computed, field))
+            try:
+                os.rename(temporary, path)
+            except OSError:
+                # Somebody else stored it in the meantime.
+                shutil.rmtree(temporary)
+
+        table = cls.__new__(cls)
+        table.scenario = scenario
+        for field in cls._FIELDS:
+            setattr(table, field, np.load(os.path.join(path, field + '.npy'), mmap_mode='r'))
+        return table
+
+    def condorcetWinners(self) -> Iterator:
+        """Iterate over pairs (profile, Condorcet winner) for all profiles having a Condorcet winner."""
+        order = self.scenario._table.order
+        for profile, i in zip(compress(self.scenario.profiles, self.hasCondorcetWinner),\
+            self.condorcetWinner[self.hasCondorcetWinner]):
+            # Spare the profile from computing it again.
+            profile._condorcetWinner = order[i]
+            yield profile, profile._condorcetWinner
+
+    def perfectTies(self) -> Iterator:
+        """Iterate over all profiles that are perfect ties."""
+        for profile in compress(self.scenario.profiles, self.isPerfectTie):
+            profile._perfectTie = True
+            yield profile
+
+    def paretoDominatedAlternatives(self) -> Iterator:
+        """Iterate over pairs (profile, set of Pareto-dominated alternatives) for all profiles with some dominated alternative."""
+        order = self.scenario._table.order
+        anyDominated = self.paretoDominated.any(axis=1)
+        for profile, dominated in zip(compress(self.scenario.profiles, anyDominated), self.paretoDominated[anyDominated]):
+            profile._paretoDominated = frozenset(compress(order, dominated))
+            yield profile, profile._paretoDominated
@@ -10,14 +10,15 @@ class AnonymousRule(AbstractRule, ABC):
     def __init__(self, scenario):
         super().__init__(scenario)
 
-        self._model = None
+        # The SAT model of this rule, for every encoding (see as_SAT).
+        self._models = {}
 
     #@final
     def as_SAT(self, encoding) -> List[int]:
         """Return this rule as a SAT model."""
         
-        if self._model is None:
-            self._model = []
+        if encoding not in self._models:
+            model = self._models[encoding] = []
             # For every profile, get the outcome.
             for profile in self.scenario.profiles:
                 outcome = self(profile)
@@ -26,9 +27,9 @@ class AnonymousRule(AbstractRule, ABC):
                     # Encode this (profile, alternative) pair and
                     literal = encoding.encode(profile, alt)
                     # If it wins, add a positive literal, negative otherwise.
-                    self._model.append(literal if alt in outcome else -literal)
+                    model.append(literal if alt in outcome else -literal)
 
-        return self._model
+        return self._models[encoding]
 
 class ScoringRule(AnonymousRule):
 
@@ -68,12 +69,12 @@ class Borda(ScoringRule):
     """The Borda rule."""
 
     def _get_score(self, ballot, alternative):
-        rank = ballot.index(alternative)
+        rank = ballot.positions[alternative]
         return (len(ballot) - rank - 1)
 
 class Plurality(ScoringRule):
     """The Borda rule."""
 
     def _get_score(self, ballot, alternative):
-        rank = ballot.index(alternative)
+        rank = ballot.positions[alternative]
         return 1 if rank == 0 else 0
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""On-disk cache of axiom instances and of their SAT encodings, shared by all processes using the same directory."""
+
+from COMSOC.interfaces.axioms import Axiom, Instance
+from COMSOC.interfaces.model import AbstractProfile
+from COMSOC.voting.encodings import RankedSATEncodingHandler
+
+from typing import List
+from array import array
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+class InstanceCache:
+    """On-disk cache of the instances of axioms, and of their SAT encodings.
+
+    For every scenario, axiom and generation strategy (heuristic or not), the cache stores the instances
+    mentioning a profile (see InstanceIndex) in an entry named after the rank of the profile. It also stores
+    the SAT encoding of all the instances of an axiom (see SAT.encodeAxioms). Instances are pickled, and
+    their encodings are stored as flat arrays of literals in memory-mappable .npy files: a process starting
+    with a warm cache neither generates nor encodes them again.
+
+    Only scenarios with a ranked SAT encoding (see RankedSATEncodingHandler) are cached, since their
+    variables are the same in every process. For the same reason, compact encodings are never stored.
+
+    The cache is bounded: when it grows beyond maxBytes, the least recently used entries are removed.
+    Like PropertyTable stores, files are written under a temporary name and then renamed, so that other
+    processes never read a partial entry."""
+
+    # Bump this when the content of the stored files changes (e.g., the attributes of some instance).
+    _VERSION = 1
+    # When the cache exceeds its bound, it is shrunk to this fraction of it (so that it is not scanned at every write).
+    _LOW_WATER = 0.75
+
+    _current = None
+
+    @classmethod
+    def use(cls, directory: str, maxBytes: int = 2**30):
+        """Cache instances and encodings in the given directory from now on, and return the cache."""
+        cls._current = cls(directory, maxBytes)
+        return cls._current
+
+    @classmethod
+    def current(cls):
+        """Return the cache in use, if any (see use)."""
+        return cls._current
+
+    @classmethod
+    def disable(cls):
+        """Stop caching instances and encodings."""
+        cls._current = None
+
+    def __init__(self, directory: str, maxBytes: int = 2**30):
+        self._directory = directory
+        self._maxBytes = maxBytes
+        # Size of the cache, computed the first time we write in it, and then updated.
+        self._size = None
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @staticmethod
+    def supports(scenario) -> bool:
+        """Check whether the instances and encodings of a scenario can be cached."""
+        return isinstance(getattr(scenario, 'SATencoding', None), RankedSATEncodingHandler)
+
+    def _axiomPath(self, axiom: Axiom) -> str:
+        """Return the directory of the entries of an axiom, determined by (scenario, axiom class)."""
+        scenario = axiom.scenario
+        digest = hashlib.sha1(f"{type(scenario).__qualname__}:{scenario}".encode()).hexdigest()
+        return os.path.join(self._directory, f"instances-v{self._VERSION}-{digest}",\
+            f"{type(axiom).__module__}.{type(axiom).__qualname__}")
+
+    def _entryPath(self, axiom: Axiom, heuristic: bool, profile: AbstractProfile, heurKey: tuple = None) -> str:
+        """Return the path (without extension) of the entry storing the instances of an axiom mentioning a profile."""
+        name = str(axiom.scenario.rankProfile(profile))
+        if heurKey:
+            name += '-' + hashlib.sha1(repr(heurKey).encode()).hexdigest()[:16]
+        return os.path.join(self._axiomPath(axiom), 'heuristic' if heuristic else 'exact', name)
+
+    def loadInstances(self, axiom: Axiom, heuristic: bool, profile: AbstractProfile, heurKey: tuple = None) -> List[Instance]:
+        """Return the stored instances of an axiom mentioning a profile (with their SAT encodings), or None if there are none.
+
+        The heuristic key is the (hashable) heuristic information the instances were generated with, if any."""
+        path = self._entryPath(axiom, heuristic, profile, heurKey)
+        try:
+            with open(path + '.pkl', 'rb') as file:
+                instances = pickle.load(file)
+            stored = np.load(path + '.npy', mmap_mode='r')
+            # Mark the entry as recently used.
+            os.utime(path + '.pkl')
+        except OSError:
+            # Either the entry was never stored, or it was just evicted.
+            return None
+
+        # The array starts with the offsets of the encodings of the instances, followed by the encodings.
+        n = len(instances)
+        offsets = stored[:n + 1].tolist()
+        literals = array('i')
+        literals.frombytes(stored[n + 1:].tobytes())
+        encoding = axiom.scenario.SATencoding
+        for i, instance in enumerate(instances):
+            instance._SATarrays = {Instance._SATarrayKey(encoding, False): literals[offsets[i]:offsets[i + 1]]}
+        return instances
+
+    def saveInstances(self, axiom: Axiom, heuristic: bool, profile: AbstractProfile, heurKey: tuple, instances: List[Instance]):
+        """Store the instances of an axiom mentioning a profile, together with their SAT encodings (see loadInstances)."""
+        encoding = axiom.scenario.SATencoding
+        arrays = [np.asarray(instance.SATarray(encoding), dtype=np.intc) for instance in instances]
+        offsets = np.cumsum([0] + [len(flat) for flat in arrays], dtype=np.intc)
+        stored = np.concatenate([offsets] + arrays)
+        self._write(self._entryPath(axiom, heuristic, profile, heurKey), stored,\
+            pickle.dumps(list(instances), protocol=pickle.HIGHEST_PROTOCOL))
+
+    def axiomCNF(self, axiom: Axiom, executor = None) -> array:
+        """Return the SAT encoding of all instances of an axiom (see Axiom.as_SAT) as a flat array, computing and storing it if needed.
+
+        If an executor is given, the encoding is computed in parallel by it."""
+        path = os.path.join(self._axiomPath(axiom), 'all')
+        flat = array('i')
+        try:
+            flat.frombytes(np.load(path + '.npy', mmap_mode='r').tobytes())
+            os.utime(path + '.npy')
+            return flat
+        except OSError:
+            pass
+
+        for clause in axiom.as_SAT(axiom.scenario.SATencoding, executor = executor):
+            flat.extend(clause)
+            flat.append(0)
+        self._write(path, np.asarray(flat, dtype=np.intc))
+        return flat
+
+    def _write(self, path: str, stored: np.ndarray, pickled: bytes = None):
+        """Atomically write an entry: an array (.npy) and, optionally, pickled data (.pkl)."""
+        size = stored.nbytes + (len(pickled) if pickled is not None else 0)
+        # Entries that would not fit are simply not stored.
+        if size > self._maxBytes * self._LOW_WATER:
+            return
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # The array goes first: readers look for the pickled data, so they never find it without the array.
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as file:
+            np.save(file, stored)
+        os.replace(temporary, path + '.npy')
+        if pickled is not None:
+            fd, temporary = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as file:
+                file.write(pickled)
+            os.replace(temporary, path + '.pkl')
+
+        if self._size is None:
+            self._size = sum(entrySize for _, entrySize in self._entries().values())
+        else:
+            self._size += size
+        if self._size > self._maxBytes:
+            self._evict()
+
+    def _entries(self) -> dict:
+        """Return a dictionary mapping every entry (path without extension) to its last use and its size."""
+        entries = {}
+        # Only our own directories: the same directory might also be, for example, the store of some scenario.
+        try:
+            roots = [os.path.join(self._directory, name) for name in os.listdir(self._directory) if name.startswith('instances-v')]
+        except OSError:
+            roots = []
+        for directory, _, files in (walked for root in roots for walked in os.walk(root)):
+            for name in files:
+                if name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Evicted by some other process.
+                    continue
+                lastUse, size = entries.get(os.path.splitext(path)[0], (0, 0))
+                entries[os.path.splitext(path)[0]] = (max(lastUse, stat.st_mtime), size + stat.st_size)
+        return entries
+
+    def _evict(self):
+        """Remove the least recently used entries, until the cache is small enough."""
+        # Other processes might have written (or removed) entries: we look at the actual content of the directory.
+        entries = self._entries()
+        self._size = sum(size for _, size in entries.values())
+        for path, (_, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+            if self._size <= self._maxBytes * self._LOW_WATER:
+                break
+            for extension in ('.pkl', '.npy'):
+                try:
+                    os.remove(path + extension)
+                except OSError:
+                    pass
+            self._size -= size
@@ -20,4 +20,106 @@ def _aux(accumulator, element):
 
 def merge_dicts(d1: dict, d2: dict):
     """Merge two dictionaries."""
-    return reduce(_aux, [d1, d2], {})
\ No newline at end of file
+    return reduce(_aux, [d1, d2], {})
+
+def clauses(flat):
+    """Iterate over the clauses (as lists) of a flat array of literals where every clause ends with 0 (as in DIMACS)."""
+    clause = []
+    for literal in flat:
+        if literal:
+            clause.append(literal)
+        else:
+            yield clause
+            clause = []
+
+def simplify_groups(groups: dict) -> dict:
+    """Simplify a group CNF (a dictionary mapping keys to lists of clauses), preserving the satisfiability of every set of groups.
+
+    Hence, the minimally unsatisfiable sets of groups stay the same. Within every group, clauses are simplified by unit
+    propagation, and duplicate, tautological and subsumed clauses are removed. Across groups, variables occurring with only
+    one sign (pure literals) are removed together with their clauses, and variables occurring in only one group are eliminated
+    by resolution, as long as this does not add clauses. Groups left without clauses are in no minimally unsatisfiable set:
+    they are left out.
+
+    Note that units and equivalences of a group cannot be substituted in the other groups (as one would do in a CNF): the
+    sets of groups not containing it would then change."""
+
+    simplified = {key : _simplify_group(group) for key, group in groups.items()}
+
+    # For every variable, the keys of the groups in which it occurs.
+    occurrences = {}
+    for key, group in simplified.items():
+        for clause in group:
+            for literal in clause:
+                occurrences.setdefault(abs(literal), set()).add(key)
+
+    def replace(key, group):
+        """Replace a group, and update the occurrences of the variables involved (which might be simplified again)."""
+        old = {abs(literal) for clause in simplified[key] for literal in clause}
+        new = {abs(literal) for clause in group for literal in clause}
+        for variable in old - new:
+            occurrences[variable].discard(key)
+        for variable in new - old:
+            occurrences[variable].add(key)
+        simplified[key] = group
+        pending.update(old)
+
+    pending = set(occurrences)
+    while pending:
+        variable = pending.pop()
+        keys = occurrences[variable]
+        positive = [(key, clause) for key in keys for clause in simplified[key] if variable in clause]
+        negative = [(key, clause) for key in keys for clause in simplified[key] if -variable in clause]
+
+        if not positive or not negative:
+            # A pure literal: setting it satisfies its clauses, whichever groups are taken.
+            for key in list(keys):
+                replace(key, [clause for clause in simplified[key] if variable not in clause and -variable not in clause])
+        elif len(keys) == 1:
+            # The variable only occurs in one group: we replace its clauses with their resolvents.
+            resolvents = set()
+            for _, p in positive:
+                for _, n in negative:
+                    resolvent = (p - {variable}) | (n - {-variable})
+                    if not any(-literal in resolvent for literal in resolvent):
+                        resolvents.add(resolvent)
+            # If the group is unsatisfiable by itself (empty resolvent), we leave it as it is.
+            if frozenset() not in resolvents and len(resolvents) <= len(positive) + len(negative):
+                key, = keys
+                rest = [clause for clause in simplified[key] if variable not in clause and -variable not in clause]
+                replace(key, _simplify_group(rest + list(resolvents)))
+
+    return {key : [sorted(clause, key = abs) for clause in group] for key, group in simplified.items() if group}
+
+def _simplify_group(group) -> list:
+    """Simplify the clauses of a group by unit propagation, and remove duplicate, tautological and subsumed ones (see simplify_groups).
+
+    Return the clauses as a list of frozensets."""
+    clauses = {frozenset(clause) for clause in group}
+    clauses = {clause for clause in clauses if not any(-literal in clause for literal in clause)}
+
+    units = set()
+    while True:
+        new = {literal for clause in clauses if len(clause) == 1 for literal in clause} - units
+        if not new:
+            break
+        units |= new
+        falsified = {-literal for literal in units}
+        reduced = set()
+        for clause in clauses:
+            if len(clause) > 1 and not clause & units:
+                clause = clause - falsified
+            # If a clause is falsified by the units, the group is unsatisfiable by itself: so are two opposite units.
+            if not clause or len(clause) == 1 and clause <= falsified:
+                variable = abs(next(iter(clause))) if clause else abs(next(iter(units)))
+                return [frozenset([variable]), frozenset([-variable])]
+            if len(clause) == 1 or not clause & units:
+                reduced.add(clause)
+        clauses = reduced
+
+    # Shorter clauses first, so that a clause can only be subsumed by the ones before it.
+    kept = []
+    for clause in sorted(clauses, key = lambda clause: (len(clause), sorted(clause))):
+        if not any(other <= clause for other in kept):
+            kept.append(clause)
+    return kept
@@ -1,25 +1,48 @@
-from typing import Set, List, Type
+from typing import Set, List, Type, Iterator
 from COMSOC.interfaces.model import AbstractScenario, AbstractProfile
+from COMSOC.helpers import clauses
 from abc import ABC, abstractmethod
+from array import array
+from itertools import chain, repeat
 
 class Axiom(ABC):
 
     """Abstract class representing a generic axiom."""
 
+    # Number of profiles (by rank) whose instances make up one task, when instances are generated by an executor.
+    shardSize = 1024
+    # Whether renaming the alternatives of an instance of this axiom gives an instance, owned (see iterInstancesOfRanks)
+    # by the renaming of its owner. Neutral axioms only need the instances of one profile per orbit (see iterInstancesUpToRenaming).
+    neutral = False
+    # Whether every rule satisfying this axiom is neutral: sets of axioms including one can be encoded up to renaming (see SAT.quotientEncoding).
+    forcesNeutrality = False
+
     def __init__(self, scenario: AbstractScenario):
         """Initialise this axiom for a specific scenario."""
         self._scenario = scenario
 
-    def as_SAT(self, encoding):
+    def as_SAT(self, encoding, compact: bool = False, executor = None) -> Iterator[List[int]]:
+
+        """Return this axiom as SAT, as an iterator over clauses.
 
-        """Return this axiom as SAT."""
+        Instances are generated one at a time (see iterInstances), so the clauses can be streamed into a solver.
+        If compact is True, instances are encoded with their compact encodings (see Instance.as_compact_SAT).
 
-        cnf = []
+        If an executor (e.g., a concurrent.futures.ProcessPoolExecutor) is given, the profiles are split in
+        ranges of ranks (see iterInstancesOfRanks), and every task returns the clauses of its range as a flat
+        array. The encoding must then be the one of the scenario (or of an equal one)."""
 
-        for instance in self.getInstances():
-            cnf += instance.as_SAT(encoding)
+        if executor is None:
+            for instance in self.iterInstances():
+                yield from (instance.as_compact_SAT(encoding) if compact else instance.as_SAT(encoding))
+            return
 
-        return cnf
+        if encoding != self.scenario.SATencoding:
+            raise ValueError("Axioms can only be encoded in parallel with the SAT encoding of their scenario.")
+        starts, stops = self._shards()
+        for start, flat in zip(starts, executor.map(_encodeRanks, repeat(self), starts, stops, repeat(compact))):
+            # Auxiliary variables are numbered by the process encoding the range: we give them our own numbers.
+            yield from clauses(encoding.importAuxiliary(flat, (str(self), start)) if compact else flat)
 
     def tree_asp(self):
         """Return facts, rules, constraints for building the ASP tree."""
@@ -35,6 +58,46 @@ class Axiom(ABC):
         """Return all instances of this axiom."""
         pass
 
+    def iterInstances(self, executor = None) -> Iterator:
+        """Iterate over all instances of this axiom, each exactly once.
+
+        By default, this iterates over getInstances(). Axioms with many instances can generate them lazily instead.
+        If an executor is given, the instances are generated by it, by ranges of ranks (see as_SAT)."""
+        if executor is None:
+            return iter(self.getInstances())
+        starts, stops = self._shards()
+        return chain.from_iterable(executor.map(_instancesOfRanks, repeat(self), starts, stops))
+
+    def iterInstancesOfRanks(self, start: int, stop: int) -> Iterator:
+        """Iterate over the instances of this axiom owned by the profiles whose rank is in range(start, stop).
+
+        Every instance is owned by exactly one profile, so the instances of all ranges are all instances, each exactly once.
+        By default, an instance is owned by the profile of least rank it mentions, and it is found through
+        getInstancesMentioning. The scenario must rank its profiles (that is, provide rankProfile and unrankProfile)."""
+        for rank in range(start, stop):
+            for instance in self.getInstancesMentioning(self.scenario.unrankProfile(rank)):
+                if min(map(self.scenario.rankProfile, instance.mentions())) == rank:
+                    yield instance
+
+    def iterInstancesUpToRenaming(self, representatives: List[AbstractProfile]) -> Iterator:
+        """Iterate over instances of this axiom that give all of its instances by renaming the alternatives.
+
+        The representatives are one profile for every set of profiles equal up to renaming the alternatives (see
+        SAT.quotientEncoding). If this axiom is neutral, these are the instances owned by the representatives;
+        otherwise, all instances."""
+        if not self.neutral:
+            return self.iterInstances()
+        ranks = map(self.scenario.rankProfile, representatives)
+        return chain.from_iterable(self.iterInstancesOfRanks(rank, rank + 1) for rank in ranks)
+
+    def _shards(self) -> tuple:
+        """Split the ranks of all profiles in ranges of shardSize ranks, returned as two lists (starts, stops)."""
+        if not hasattr(self.scenario, 'unrankProfile'):
+            raise ValueError("Instances can only be generated in parallel for scenarios ranking their profiles.")
+        n = self.scenario.nProfiles
+        starts = list(range(0, n, self.shardSize))
+        return starts, [min(start + self.shardSize, n) for start in starts]
+
     @abstractmethod
     def getInstancesMentioning(self, profile: AbstractProfile) -> Set:
         """Return all instances of this axiom mentioning a specific profile."""
@@ -58,6 +121,21 @@ class Axiom(ABC):
         # Name of axiom and scenario.
         return hash((str(self), self.scenario))
 
+def _encodeRanks(axiom: Axiom, start: int, stop: int, compact: bool) -> array:
+    """Return the SAT encoding of the instances of an axiom owned by the profiles of ranks in range(start, stop), as a flat
+    array (see Instance.SATarray). Run by the executor of Axiom.as_SAT."""
+    encoding = axiom.scenario.SATencoding
+    flat = array('i')
+    for instance in axiom.iterInstancesOfRanks(start, stop):
+        for clause in (instance.as_compact_SAT(encoding) if compact else instance.as_SAT(encoding)):
+            flat.extend(clause)
+            flat.append(0)
+    return flat
+
+def _instancesOfRanks(axiom: Axiom, start: int, stop: int) -> list:
+    """Return the instances of an axiom owned by the profiles of ranks in range(start, stop). Run by the executor of Axiom.iterInstances."""
+    return list(axiom.iterInstancesOfRanks(start, stop))
+
 class IntraprofileAxiom(Axiom):
 
     """Axiom whose instances must mention only one profile."""
@@ -77,7 +155,11 @@ class InterprofileAxiom(Axiom):
 class Instance(ABC):
 
     """Class representing an axiom instance."""
-    
+
+    # Searches hold many instances: let subclasses decide whether they need a __dict__. Subclasses with slots
+    # also reserve '_SATarrays' (see SATarray) and 'created_by' (the creating axiom, see InstanceIndex).
+    __slots__ = ()
+
     @property
     @abstractmethod
     def axiom(self) -> Type[Axiom]:
@@ -129,6 +211,67 @@ class Instance(ABC):
         """Return the SAT encoding of this instance."""
         pass
 
+    def SATarray(self, encoding, compact: bool = False) -> array:
+        """Return the SAT encoding of this instance as a flat array of literals, where every clause ends with 0 (as in DIMACS).
+
+        The array is computed once per encoding handler (and per choice of compact, see as_compact_SAT), and then stored.
+        Compact arrays may use auxiliary variables: they are only shared between handlers numbering them in the same way."""
+        key = self._SATarrayKey(encoding, compact)
+        try:
+            return self._SATarrays[key]
+        except AttributeError:
+            self._SATarrays = {}
+        except KeyError:
+            pass
+        flat = array('i')
+        for clause in (self.as_compact_SAT(encoding) if compact else self.as_SAT(encoding)):
+            flat.extend(clause)
+            flat.append(0)
+        self._SATarrays[key] = flat
+        return flat
+
+    @staticmethod
+    def _SATarrayKey(encoding, compact: bool) -> tuple:
+        """Return the key under which SATarray stores the array of an encoding handler (and choice of compact)."""
+        return (encoding, compact, getattr(encoding, 'auxiliaryScope', None) if compact else None)
+
+    def __getstate__(self):
+        """Return the pickling information, leaving out the stored SAT encodings (see SATarray) and the creating axiom."""
+        state = dict(getattr(self, '__dict__', {}))
+        for cls in type(self).__mro__:
+            state.update((name, getattr(self, name)) for name in cls.__dict__.get('__slots__', ()) if hasattr(self, name))
+        state.pop('_SATarrays', None)
+        state.pop('created_by', None)
+        return state
+
+    def __setstate__(self, state):
+        """Unpickle the object."""
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def _pack(self, scenario):
+        """Return this instance as a tuple of non-negative integers (e.g., ranks of profiles), or None if it cannot be packed.
+
+        Packed instances are stored compactly by InstanceIndex. Equal instances must have equal packed forms, and
+        _unpack must return an instance equal to this one. By default, instances cannot be packed."""
+        return None
+
+    @classmethod
+    def _unpack(cls, scenario, packed: tuple):
+        """Return the instance with the given packed form (see _pack)."""
+        raise NotImplementedError("This instance cannot be packed.")
+
+    def materialise(self):
+        """Return this instance as an object of its own class (see InstanceView). An instance is already materialised."""
+        return self
+
+    def as_compact_SAT(self, encoding) -> List[List[int]]:
+        """Return a (possibly) smaller SAT encoding of this instance, which may use auxiliary variables of the encoding.
+
+        The auxiliary variables must only appear in the clauses of this instance, so that a set of instances is
+        satisfiable under this encoding if and only if it is under as_SAT. By default, this is just as_SAT."""
+        return self.as_SAT(encoding)
+
     def as_asp(self, encoding) -> List[str]:
         pass
 
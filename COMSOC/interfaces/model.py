@@ -70,6 +70,9 @@ class AbstractOutcome(ABC):
 class AbstractProfile(ABC):
     """Abstract interface representing a preference profile."""
 
+    # Scenarios hold many profiles: let subclasses decide whether they need a __dict__.
+    __slots__ = ()
+
     @abstractmethod
     def __init__(self):
         """Initialise the profile."""
@@ -23,6 +23,8 @@ class AbstractGoalConstraint(Instance):
 
     """Class representing the fact that some outcome must not hold in a profile."""
 
+    __slots__ = ('_profile', '_outcome', '_SATarrays', 'created_by')
+
     def __init__(self, profile, outcome):
         self._profile = profile
         self._outcome = outcome
@@ -37,7 +39,7 @@ class AbstractGoalConstraint(Instance):
     
     def mentions(self) -> Set[AbstractProfile]:
         """Return the set of profiles mentioned by this instance."""
-        return set(self._profile)
+        return {self._profile}
 
     def _isEqual(self, other) -> bool:
         """Defines the condition for equality between two instances of this axiom."""
@@ -57,6 +59,8 @@ class AbstractGoalConstraint(Instance):
 
 class AnonymousGoal(AbstractGoalConstraint):
 
+    __slots__ = ()
+
     def as_SAT(self, encoding):
         p, o = self._profile, self._outcome
         return [[encoding.encode(p, a) if a not in o else -encoding.encode(p, a) for a in self.profile.alternatives]]    
@@ -128,6 +132,8 @@ class DerivedAxiom(IntraprofileAxiom):
 class DerivedAxiomInstance(Instance):
     """An instance of a derived axiom."""
 
+    __slots__ = ('_SATarrays', 'created_by')
+
     @abstractmethod
     def convertToActivatorsInstances(self) -> Set[Instance]:
         """Convert this instance in a set of instances that imply it."""
@@ -144,44 +150,26 @@ class Symmetry(DerivedAxiom):
 
     def getInstances(self):
         insts = set()
-        for profile in scenario.profiles:
+        for profile in self.scenario.profiles:
             # This returns the set of instances regarding `profile`
             # (possibly empty).
             insts.update(self.getInstancesMentioning(profile))
         return insts
     
     def getInstancesMentioning(self, profile):
-
-        insts = set()
-
-        ballots = list(profile.uniqueBallots())
-        profile_dict = profile.as_dict()
-
-        # Get one ballot as reference. We try to match this to other ballots in this profile to construct a self-mapping.
-        reference, rest = ballots[0], ballots[1:]
-
-        for ballot in rest:
-            # If they can be mapped, they must have the same counter:
-            if profile_dict[ballot] == profile_dict[reference]:
-
-                # We try to map this profile into itself by mapping the reference ballot to the current one.
-                mapping = {i:j for i, j in zip(reference, ballot)}
-                # Construct the new one.
-                new_profile_dict = {}
-                for b, c in profile_dict.items():
-                    new_ballot = (mapping[i] for i in b)
-                    new_profile_dict[AnonymousPreference(new_ballot)] = c
-
-                # If we succesfully auto-mapped:
-                if new_profile_dict == profile_dict:
-                    insts.add(SymmetryInstance(profile, mapping))
-
-        return insts
+        # Every renaming of the alternatives mapping the profile into itself (except the identity, which comes first).
+        # Rotations of the same clusters give equal instances: we keep the first one when mapping some reference
+        # ballot to the other ballots of the profile (in their order).
+        reference = profile.anyBallot()
+        mappings = sorted(profile.automorphisms()[1:], key = lambda mapping: AnonymousPreference(mapping[x] for x in reference).id)
+        return {SymmetryInstance(profile, {x : mapping[x] for x in reference}) for mapping in mappings}
 
 class SymmetryInstance(DerivedAxiomInstance):
 
     """Instance of the `Symmetry` derived axiom."""
 
+    __slots__ = ('_profile', '_mapping', '_clusters')
+
     def _getClusters(self, mapping):
 
         """Given a mapping M from alternatives to alternatives expressing an equivalence relation, return the equivalence classes.
@@ -358,11 +346,11 @@ class QuasiTiedWinner(DerivedAxiom):
             if prof is not None:
                 return prof
 
-            if reference.index(winner) == len(reference) - 1:
+            rank = reference.positions[winner]
+            if rank == len(reference) - 1:
                 return None
             else:
                 reference = list(reference)
-                rank = reference.index(winner)
                 reference[rank] = reference[rank + 1]
                 reference[rank + 1] = winner
                 reference = AnonymousPreference(reference)
@@ -388,6 +376,8 @@ class QuasiTiedWinnerInstance(DerivedAxiomInstance):
 
     """Instance of the `Quasi Tied Winner` derived axiom."""
 
+    __slots__ = ('_profile', '_canc_profile', '_winner')
+
     def __init__(self, profile, canc_profile, winner):
         self._profile = profile
         self._canc_profile = canc_profile
@@ -475,11 +465,11 @@ class QuasiTiedLoser(DerivedAxiom):
             if prof is not None:
                 return prof
 
-            if reference.index(loser) == 0:
+            rank = reference.positions[loser]
+            if rank == 0:
                 return None
             else:
                 reference = list(reference)
-                rank = reference.index(loser)
                 reference[rank] = reference[rank - 1]
                 reference[rank - 1] = loser
                 reference = AnonymousPreference(reference)
@@ -503,6 +493,8 @@ class QuasiTiedLoserInstance(DerivedAxiomInstance):
 
     """Instance of the `Quasi Tied Loser` derived axiom."""
 
+    __slots__ = ('_profile', '_canc_profile', '_loser')
+
     def __init__(self, profile, canc_profile, loser):
         self._profile = profile
         self._canc_profile = canc_profile
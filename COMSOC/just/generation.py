@@ -1,10 +1,203 @@
-from collections import deque
+from collections import deque, OrderedDict
 from COMSOC.interfaces.model import AbstractProfile, AbstractOutcome, AbstractScenario
 from COMSOC.interfaces.axioms import Instance, Axiom
+from COMSOC.cache import InstanceCache
+from COMSOC.helpers import clauses
 
-from typing import Set, Iterator
+from typing import Set, Iterator, List, Type
+from array import array
 
 
+class InstanceView(Instance):
+    """Lightweight stand-in for an instance stored (packed) in an InstanceIndex.
+
+    A view only holds its index and its row: the instance itself is materialised (see Instance._unpack) when
+    needed, for example, to print it. The index hands out one view per instance, so views are equal if and
+    only if they are the same object. The SAT encoding of a view is stored by its index."""
+
+    __slots__ = ('_index', '_row')
+
+    def __init__(self, index, row: int):
+        self._index = index
+        self._row = row
+
+    def materialise(self) -> Instance:
+        return self._index._unpack(self._row)
+
+    @property
+    def axiom(self) -> Type[Axiom]:
+        return type(self._index._axiom)
+
+    @property
+    def created_by(self) -> Axiom:
+        return self._index._axiom
+
+    def mentions(self) -> Set[AbstractProfile]:
+        return self.materialise().mentions()
+
+    def _isEqual(self, other) -> bool:
+        return self is other
+
+    def _hashable(self):
+        return self._row
+
+    def __str__(self):
+        return str(self.materialise())
+
+    def as_SAT(self, encoding) -> List[List[int]]:
+        return list(clauses(self.SATarray(encoding)))
+
+    def as_compact_SAT(self, encoding) -> List[List[int]]:
+        return list(clauses(self.SATarray(encoding, compact = True)))
+
+    def SATarray(self, encoding, compact: bool = False) -> array:
+        return self._index._SATarray(self._row, encoding, compact)
+
+    def as_asp(self, encoding) -> List[str]:
+        return self.materialise().as_asp(encoding)
+
+    def from_asp(self, fact : str, encoding, prettify = False) -> str:
+        return self.materialise().from_asp(fact, encoding, prettify)
+
+    def __reduce__(self):
+        # Views are only meaningful within their index: we pickle the instance itself.
+        return (_identity, (self.materialise(),))
+
+def _identity(instance: Instance) -> Instance:
+    return instance
+
+class InstanceIndex:
+    """Index mapping every profile to the instances of an axiom mentioning it.
+
+    There is one index per axiom (hence, per scenario) and per generation strategy (heuristic or not), shared
+    by all instance graphs: instances are generated the first time some search asks for them, and then looked up.
+    Instances are stored once, by id, so that an instance found from two profiles is the same object.
+    If an InstanceCache is in use, instances are also looked up in (and stored to) it.
+
+    Instances that can be packed (see Instance._pack) are not kept: their packed forms are stored as rows of
+    an array (one column per integer), together with their SAT encodings, and the index hands out views of
+    them (see InstanceView). Other instances are stored as they are.
+
+    At most maximum indexes are kept: beyond that, the least recently used one is forgotten (views handed out
+    by it remain valid, but a new index is built if its axiom is used again)."""
+
+    maximum = 64
+    _indexes = OrderedDict()
+
+    @classmethod
+    def of(cls, axiom: Axiom, heuristic: bool):
+        """Return the (unique) index of an axiom, for a given generation strategy."""
+        key = (axiom, heuristic)
+        try:
+            cls._indexes.move_to_end(key)
+            return cls._indexes[key]
+        except KeyError:
+            index = cls._indexes[key] = cls(axiom, heuristic)
+            while len(cls._indexes) > cls.maximum:
+                cls._indexes.popitem(last = False)
+            return index
+
+    @classmethod
+    def clear(cls):
+        """Forget all indexes (for example, to free memory)."""
+        cls._indexes.clear()
+
+    def __init__(self, axiom: Axiom, heuristic: bool):
+        self._axiom = axiom
+        self._heuristic = heuristic
+        # The instances (or views) by id, the id of every instance (or packed form), and the ids of the instances mentioning a profile.
+        self._instances = []
+        self._ids = {}
+        self._mentioning = {}
+
+        # The packed instances: their class (the first class that can be packed), and their rows, one after the other.
+        self._packedClass = None
+        self._width = None
+        self._packed = array('q')
+        # The SAT encodings of packed instances (compact or not): flat arrays, and where the clauses of every row start and stop.
+        self._encoded = {compact : (array('i'), array('q'), array('q')) for compact in (False, True)}
+
+    def _register(self, instance: Instance) -> int:
+        """Return the id of an instance, storing it (or its packed form) if it is new."""
+        packed = instance._pack(self._axiom.scenario) if self._packedClass in (None, type(instance)) else None
+        key = instance if packed is None else array('q', packed).tobytes()
+        try:
+            return self._ids[key]
+        except KeyError:
+            pass
+
+        if packed is None:
+            # Register the axiom creating the instance.
+            instance.created_by = self._axiom
+            self._instances.append(instance)
+        else:
+            if self._packedClass is None:
+                self._packedClass, self._width = type(instance), len(packed)
+            row = len(self._packed) // self._width
+            self._packed.extend(packed)
+            for flat, starts, stops in self._encoded.values():
+                starts.append(-1)
+                stops.append(-1)
+            # Keep the encodings the instance already has (e.g., if read from an InstanceCache).
+            encoding = self._axiom.scenario.SATencoding
+            for compact in (False, True):
+                flat = getattr(instance, '_SATarrays', {}).get(Instance._SATarrayKey(encoding, compact))
+                if flat is not None:
+                    self._storeSATarray(row, compact, flat)
+            self._instances.append(InstanceView(self, row))
+
+        self._ids[key] = len(self._instances) - 1
+        return self._ids[key]
+
+    def _unpack(self, row: int) -> Instance:
+        """Return the packed instance of a given row."""
+        instance = self._packedClass._unpack(self._axiom.scenario, tuple(self._packed[row * self._width:(row + 1) * self._width]))
+        instance.created_by = self._axiom
+        return instance
+
+    def _storeSATarray(self, row: int, compact: bool, flat: array):
+        clauses, starts, stops = self._encoded[compact]
+        starts[row] = len(clauses)
+        clauses.extend(flat)
+        stops[row] = len(clauses)
+
+    def _SATarray(self, row: int, encoding, compact: bool) -> array:
+        """Return the SAT encoding of the packed instance of a given row (see Instance.SATarray).
+
+        Encodings with the SAT encoding of the scenario are computed once, and then stored (for compact encodings, only
+        with that very handler, as other handlers number auxiliary variables differently)."""
+        own = self._axiom.scenario.SATencoding
+        if encoding != own or (compact and encoding is not own):
+            return self._unpack(row).SATarray(encoding, compact)
+        clauses, starts, stops = self._encoded[compact]
+        if starts[row] < 0:
+            self._storeSATarray(row, compact, self._unpack(row).SATarray(encoding, compact))
+        return clauses[starts[row]:stops[row]]
+
+    def instancesMentioning(self, profile: AbstractProfile, heur_info: dict = None) -> Set[Instance]:
+        """Return the instances of the axiom mentioning a profile (generated with the heuristic strategy, if this index uses it).
+
+        Heuristic strategies may depend on the heuristic information, which is then part of the key."""
+        key = (profile, tuple(sorted(heur_info.items())) if self._heuristic and heur_info else None)
+        try:
+            ids = self._mentioning[key]
+        except KeyError:
+            # If there is an on-disk cache, look there first (see COMSOC.cache).
+            cache = InstanceCache.current()
+            if cache is not None and not cache.supports(self._axiom.scenario):
+                cache = None
+            instances = cache.loadInstances(self._axiom, self._heuristic, *key) if cache is not None else None
+
+            if instances is None:
+                if self._heuristic:
+                    instances = self._axiom.getInstancesMentioningHeuristic(profile, heur_info)
+                else:
+                    instances = self._axiom.getInstancesMentioning(profile)
+                if cache is not None:
+                    cache.saveInstances(self._axiom, self._heuristic, *key, instances)
+            ids = self._mentioning[key] = array('q', map(self._register, instances))
+        return {self._instances[i] for i in ids}
+
 class InstanceGraph:
     """An instance graph (of a given set of axioms)."""
 
@@ -22,14 +215,8 @@ class InstanceGraph:
             # Generate the intra-profile axioms regarding this node. 
             for axiom in graph.intraAxioms:
                 # If the instsance graph is heuristic, use the heuiristic generation method instead.
-                if graph.isHeuristic():
-                    instances = axiom.getInstancesMentioningHeuristic(self.profile)
-                else:
-                    instances = axiom.getInstancesMentioning(self.profile)
-
-                # Register the axiom creating the instances.
-                for instance in instances:
-                    instance.created_by = axiom
+                # The index generates the instances only once, and registers the axiom creating them.
+                instances = InstanceIndex.of(axiom, graph.isHeuristic()).instancesMentioning(self.profile)
 
                 # Add the instances to the node.
                 self._instances.update(instances)
@@ -201,14 +388,9 @@ class InstanceGraph:
             for axiom in self.interAxioms:
 
                 # If the graph uses the heuristics, we ask the axiom to generate the instances using heuristics. Note that this requires passing the heuristic information to the axiom.
-                if self.isHeuristic():
-                    instances = axiom.getInstancesMentioningHeuristic(currentNode.profile, currentNode.getHeuristicInfo())
-                else:
-                    instances = axiom.getInstancesMentioning(currentNode.profile)
-
-                # Register the axiom creating the instances.
-                for instance in instances:
-                    instance.created_by = axiom
+                # The index generates the instances only once, and registers the axiom creating them.
+                instances = InstanceIndex.of(axiom, self.isHeuristic()).instancesMentioning(currentNode.profile,\
+                    currentNode.getHeuristicInfo() if self.isHeuristic() else None)
 
                 # Add the generated instances to the internal state.
                 self.addInstances(instances)
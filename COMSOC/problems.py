@@ -1,4 +1,4 @@
-from COMSOC.reasoning import AbstractReasoner, SAT
+from COMSOC.reasoning import AbstractReasoner, SAT, IncrementalSAT, FewestProfilesSAT
 from COMSOC.interfaces.model import AbstractScenario, AbstractProfile, AbstractOutcome
 from COMSOC.interfaces.axioms import Axiom, Instance
 
@@ -111,6 +111,8 @@ class DecisionProblem(AbstractProblem):
         for strategy in strategies:
             if strategy == 'SAT':
                 return SAT(getScenario(self._axioms).SATencoding)
+            if strategy == 'compactSAT':
+                return SAT(getScenario(self._axioms).SATencoding, compact = True)
 
     @abstractmethod
     def _apply_reasoner(self, reasoner: AbstractReasoner):
@@ -207,8 +209,12 @@ class JustificationProblem(AbstractProblem):
         # stating that, for all profiles, at least one alternative should win.
         self._corpus = corpus.union(self.scenario.defaultAxioms)
 
+        # The instances of every depth of the search include those of the previous one: the reasoners add them as they come.
         self.reasoners = {
-            "SAT" : SAT(self.scenario.SATencoding)
+            "SAT" : IncrementalSAT(self.scenario.SATencoding),
+            "compactSAT" : IncrementalSAT(self.scenario.SATencoding, compact = True),
+            # The explanations mentioning the fewest profiles (then, the fewest instances) come first.
+            "fewestProfilesSAT" : FewestProfilesSAT(self.scenario.SATencoding)
         }
 
     @property
@@ -234,8 +240,13 @@ class JustificationProblem(AbstractProblem):
     
 
     def _extract(self, instances: Set[Instance], extract, \
-            nontriviality, kwargs) -> Iterator:
-        """Given a set of instances, iterate over the justifications that can be extracted from this set."""
+            nontriviality, kwargs, hardGoal: bool = False, order: str = None) -> Iterator:
+        """Given a set of instances, iterate over the justifications that can be extracted from this set.
+
+        If hardGoal is True, the goal constraint is in every subset of instances considered (it is a hard group for the
+        MUS enumerator): the MUSes found are then explanations, unless they are unsatisfiable without the goal.
+        Otherwise, it is one of the instances, and only the MUSes including it are explanations.
+        If order is "smallest", the MUSes are enumerated smallest first (see SAT.enumerateSmallestMUSes)."""
 
         # Add the goal constraint to the instances.
         instances.add(self.goal)
@@ -248,57 +259,65 @@ class JustificationProblem(AbstractProblem):
         else:
             extract_reasoner = self.reasoners[extract]
 
+        if order == "smallest":
+            enumerateMUSes = extract_reasoner.enumerateSmallestMUSes
+        elif order is None:
+            enumerateMUSes = extract_reasoner.enumerateMUSes
+        else:
+            raise ValueError(f"Unknown order of the MUSes: {order}.")
+
         # If the set of instances is unsatisfiable, it might contain a justification.
         if not extract_reasoner.checkInstances(instances):
 
-            # Enumerate all MUSes of these instances...
-            for MUS in extract_reasoner.enumerateMUSes(instances):
-
-                # An MUS is an explanation iff it contains the goal profile.
-
-                try:
-
-                    # We TRY to remove the gaol profile. Note that if this fails, it raises a KeyError, handled below.
-                    MUS.remove(self.goal)
-
-                    # Construct the explanation. It is made by the regular axiom instances, and for the derivedaxiom instances,
-                    # by the instances of the axioms which imply them.
-
-                    explanation = set()
-                    normative = set()
-                    for instance in MUS:
-                        # If it is a heuristic instance...
-                        if isinstance(instance, DerivedAxiomInstance):
-                            # Get the scenario.
-                            scenario = instance.created_by.scenario
-                            # Get the "implying" instances.
-                            impl_inst = instance.convertToActivatorsInstances()
-                            # Add them to the explanation.
-                            explanation.update(impl_inst)
-                            # Add the axioms to the normative basis.
-                            normative.update({inst.axiom(scenario) for inst in impl_inst})
-                        else:
-                            explanation.add(instance)
-                            # This field is initialised during search, by the graph class.
-                            normative.add(instance.created_by)
-
-                    # If the normative basis is nontrivial (or if we do not perform the check),
-                    # yield the justification.
-                    if CheckAxioms(normative).solve(strategy = nontriviality, **kwargs):
-                        yield Justification(self, normative, explanation)
-                except KeyError:  # If the goal is not in the MUS,
-                    # We handle by doing nothing. Indeed, we will just continue iterating over the MUSes.
-                    pass
+            if hardGoal:
+                # Enumerate the minimal sets of instances that are unsatisfiable with the goal constraint...
+                # (the ones that are unsatisfiable by themselves are MUSes without the goal: they do not explain it.)
+                MUSes = (MUS for MUS in enumerateMUSes(instances - {self.goal}, {self.goal})\
+                    if extract_reasoner.checkInstances(MUS))
+            else:
+                # Enumerate all MUSes of these instances: an MUS is an explanation iff it contains the goal profile.
+                MUSes = (MUS - {self.goal} for MUS in enumerateMUSes(instances) if self.goal in MUS)
+
+            for MUS in MUSes:
+
+                # Construct the explanation. It is made by the regular axiom instances, and for the derivedaxiom instances,
+                # by the instances of the axioms which imply them.
+
+                explanation = set()
+                normative = set()
+                for instance in MUS:
+                    # If it is a heuristic instance...
+                    if isinstance(instance, DerivedAxiomInstance):
+                        # Get the scenario.
+                        scenario = instance.created_by.scenario
+                        # Get the "implying" instances.
+                        impl_inst = instance.convertToActivatorsInstances()
+                        # Add them to the explanation.
+                        explanation.update(impl_inst)
+                        # Add the axioms to the normative basis.
+                        normative.update({inst.axiom(scenario) for inst in impl_inst})
+                    else:
+                        # Instances might be views (see InstanceView): the explanation holds the instances themselves.
+                        explanation.add(instance.materialise())
+                        # This field is initialised during search, by the graph class.
+                        normative.add(instance.created_by)
+
+                # If the normative basis is nontrivial (or if we do not perform the check),
+                # yield the justification.
+                if CheckAxioms(normative).solve(strategy = nontriviality, **kwargs):
+                    yield Justification(self, normative, explanation)
 
     def solve(self, extract: str, nontriviality: str, depth: int=None, heuristics: bool=False,\
-        maximum: int=-1, derivedAxioms = set(), **kwargs) -> Iterator:
+        maximum: int=-1, derivedAxioms = set(), hardGoal: bool = False, order: str = None,\
+        **kwargs) -> Iterator:
 
         """Iterate over the justifications for this problem.
 
             Parameters
             ----------
             extract : str
-                Strategy to be used in the extraction phase.
+                Strategy to be used in the extraction phase: "SAT", "compactSAT", or "fewestProfilesSAT" (explanations
+                mentioning the fewest profiles first, then the fewest instances).
             check : str
                 Strategy to be used in the nontriviality check.
             depth : int
@@ -309,6 +328,12 @@ class JustificationProblem(AbstractProblem):
                 How many justifications to retrieve. Default: all.
             derivedAxioms : set
                 Heuristic axioms to add. Default: none.
+            hardGoal : bool
+                Whether the goal constraint is a hard group in the extraction phase, so that only explanations are
+                enumerated (see _extract). Default: False
+            order : str
+                Order in which the MUSes are enumerated: "smallest" for smallest first, so that the first justification
+                found at a depth has a smallest explanation (see _extract). Default: None (any order).
 
             Returns
             -------
@@ -338,7 +363,7 @@ class JustificationProblem(AbstractProblem):
         # returns all instances up to depth 0; then up to depth 1; etc...
         for instances in graph.BFS(self.profile, depth):
             # Try to extract a justification from these instances:
-            for justification in self._extract(instances, extract, nontriviality, kwargs):
+            for justification in self._extract(instances, extract, nontriviality, kwargs, hardGoal, order):
                 # if we find one, yield it
                 
                 yield justification
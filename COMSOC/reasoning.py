@@ -5,14 +5,18 @@ from abc import ABC, abstractmethod
 from COMSOC.interfaces.axioms import Axiom, Instance
 from COMSOC.interfaces.model import AbstractScenario
 from COMSOC.interfaces.rules import AbstractRule
+from COMSOC.helpers import clauses, simplify_groups
+from COMSOC.cache import InstanceCache
 
-from typing import Set, Type, Iterator, List
-import os
+from typing import Set, Type, Iterator, Iterable, List
+from itertools import chain
+from heapq import merge
+from array import array
 from pysat.solvers import Minisat22 as pySAT
+from pysat.formula import WCNF
+from pysat.examples.optux import OptUx
 
-from time import time
-
-from COMSOC.MARCO.src.marco.marco import parse_args, enumerate_with_args
+from COMSOC.MARCO.src.marco.marco import enumerate_groups
 
 class AbstractReasoner(ABC):
 
@@ -52,8 +56,8 @@ class AbstractReasoner(ABC):
         pass
 
     @abstractmethod
-    def _getRule(self, scenario, encoded_thing) -> AbstractRule:
-        """Return an aggregation function (for the input scenario) that satisfies the input axiom instances."""
+    def _getRule(self, axioms: Set[Axiom], encoded_thing) -> AbstractRule:
+        """Return an aggregation function (for the scenario of the input axioms) that satisfies the encoded axioms."""
         pass
 
     #@final
@@ -70,13 +74,11 @@ class AbstractReasoner(ABC):
     #@final
     def findRule(self, axioms: Set[Type[Instance]]) -> AbstractRule:
 
-        scenario = self.getScenario(axioms)
-
         """Return an aggregation function (for the input scenario) that satisfies the input axiom instances."""
-        return self._getRule(scenario, self.encodeAxioms(axioms))
+        return self._getRule(axioms, self.encodeAxioms(axioms))
 
     @abstractmethod
-    def enumerateMUSes(self, instances: Set[Instance]) -> Iterator[Set[Instance]]:
+    def enumerateMUSes(self, instances: Set[Instance], hard: Set[Instance] = frozenset()) -> Iterator[Set[Instance]]:
 
         """Enumerate the subsets of that input instances that are minimally unsatisfiable.
 
@@ -84,6 +86,9 @@ class AbstractReasoner(ABC):
             ----------
             instances : Set[Instance]
                 A set of instances.
+            hard : Set[Instance]
+                A set of instances that every subset includes. The MUSes are then the minimal subsets of the other
+                instances that are unsatisfiable together with these (which are not returned). Default: none.
 
             Returns
             -------
@@ -94,50 +99,101 @@ class AbstractReasoner(ABC):
         pass
 
     @abstractmethod
-    def _doesRuleSatisfy(self, encoded_thing, rule: AbstractRule) -> bool:
+    def _doesRuleSatisfy(self, axioms: Set[Axiom], encoded_thing, rule: AbstractRule) -> bool:
         pass
 
     
     #@final
     def checkRule(self, axioms: Set[Type[Instance]], rule: AbstractRule) -> bool:
         """Check whether an aggregation rule (for a given scenario) satisfies the input axioms."""
-        return self._doesRuleSatisfy(self.encodeAxioms(axioms), rule)
+        return self._doesRuleSatisfy(axioms, self.encodeAxioms(axioms), rule)
 
 class SAT(AbstractReasoner):
 
-    """SAT reasoner. See the AbstractReasoner class for more details."""
+    """SAT reasoner. See the AbstractReasoner class for more details.
+
+    If compact is True, instances are encoded with their compact encodings (see Instance.as_compact_SAT).
+    If an executor is given, axioms are encoded in parallel by it (see Axiom.as_SAT).
+    Unless quotient is False, sets of axioms including Neutrality are encoded up to renaming the alternatives (see quotientEncoding)."""
 
-    def __init__(self, encoding):
+    def __init__(self, encoding, compact: bool = False, executor = None, quotient: bool = True):
         self._encoding = encoding
-        # The SAT reasoner communicates with the MUS enumerator through a text file. We declare here its name.
-        self.FILE_NAME = f"dump_{time()}.gcnf"
+        self._compact = compact
+        self._executor = executor
+        self._quotient = quotient
 
     @property
     def encoding(self):
         return self._encoding
     
+    def _encodeInstance(self, instance: Instance) -> array:
+        """Return the SAT encoding of an instance (compact, if this reasoner is), as a flat array (see Instance.SATarray)."""
+        return instance.SATarray(self.encoding, self._compact)
+
     def encodeInstances(self, instances: Set[Instance]):
-        cnf = []
-        for instance in instances:
-            cnf += instance.as_SAT(self.encoding)
-        return cnf
+        # Instances store their encoding, so encoding them again (e.g., at the next depth of a search) costs nothing.
+        return chain.from_iterable(clauses(self._encodeInstance(instance)) for instance in instances)
 
     
+    def _encodeAxiom(self, axiom: Axiom) -> Iterator[List[int]]:
+        """Return the SAT encoding of an axiom (compact, if this reasoner is), as an iterator over clauses."""
+        # If there is an on-disk cache (see COMSOC.cache) and the axiom is encoded as the cache would, read it from there.
+        cache = InstanceCache.current()
+        if cache is not None and not self._compact and cache.supports(axiom.scenario)\
+            and self.encoding == axiom.scenario.SATencoding:
+            return clauses(cache.axiomCNF(axiom, self._executor))
+        # The clauses are generated lazily (see Axiom.as_SAT), and consumed by the solver as they come.
+        return axiom.as_SAT(self.encoding, compact = self._compact, executor = self._executor)
+
+    def quotientEncoding(self, axioms: Set[Axiom]):
+        """Return the encoding of a set of axioms up to renaming the alternatives, or None if they are encoded in full.
+
+        If the axioms include Neutrality, the outcomes of a rule satisfying them on profiles equal up to renaming
+        the alternatives determine each other: the outcomes on one representative per orbit are enough. The scenario
+        then provides an encoding giving variables to the representatives only (neutralSATencoding, see
+        NeutralSATEncodingHandler). Each axiom only contributes the instances that give all of its instances by renaming
+        (see Axiom.iterInstancesUpToRenaming): for Neutrality, those mapping a representative into itself."""
+        scenario = self.getScenario(axioms)
+        quotient = getattr(scenario, 'neutralSATencoding', None)
+        # The quotient encoding refines the one of the scenario: we do not use it with other encodings.
+        if not self._quotient or quotient is None or self.encoding != scenario.SATencoding:
+            return None
+        return quotient if any(axiom.forcesNeutrality for axiom in axioms) else None
+
+    def _axiomsEncoding(self, axioms: Set[Axiom]):
+        """Return the encoding used for a set of axioms (see quotientEncoding)."""
+        quotient = self.quotientEncoding(axioms)
+        return self.encoding if quotient is None else quotient
+
     def encodeAxioms(self, axioms):
-        cnf = []
+        quotient = self.quotientEncoding(axioms)
+        if quotient is not None:
+            return self._encodeQuotient(axioms, quotient)
+        return chain.from_iterable(self._encodeAxiom(axiom) for axiom in axioms)
+
+    def _encodeQuotient(self, axioms: Set[Axiom], encoding) -> Iterator[List[int]]:
+        """Return the SAT encoding of a set of axioms up to renaming the alternatives (see quotientEncoding), as an iterator over clauses."""
+        representatives = list(self.getScenario(axioms).canonicalProfiles)
+        # Once profiles are replaced by their representatives, many clauses are equal or always satisfied: we skip them.
+        seen = set()
         for axiom in axioms:
-            cnf += axiom.as_SAT(self.encoding)
-        return cnf
+            for instance in axiom.iterInstancesUpToRenaming(representatives):
+                for clause in (instance.as_compact_SAT(encoding) if self._compact else instance.as_SAT(encoding)):
+                    literals = frozenset(clause)
+                    if literals in seen or any(-literal in literals for literal in literals):
+                        continue
+                    seen.add(literals)
+                    yield clause
 
     
-    def _isSatisfiable(self, cnf: List[List[int]]) -> bool:
-        """Check whether a cnf (list of lists of non-zero integers) is satisfiable."""
+    def _isSatisfiable(self, cnf: Iterable[List[int]]) -> bool:
+        """Check whether a cnf (iterable of lists of non-zero integers) is satisfiable."""
         with pySAT(bootstrap_with = cnf) as l:
             solvable = l.solve()
         return solvable
 
     
-    def _getModel(self, cnf: List[List[int]]) -> List[int]:
+    def _getModel(self, cnf: Iterable[List[int]]) -> List[int]:
         """Given a (satisfiable) cnf, return a model (list of literals)."""
 
         with pySAT(bootstrap_with = cnf) as l:
@@ -146,48 +202,58 @@ class SAT(AbstractReasoner):
         return model
 
     
-    def _getRule(self, scenario, cnf) -> AbstractRule:
+    def _getRule(self, axioms, cnf) -> AbstractRule:
 
         # Get an assignment satysfing the input instances.
         model = self._getModel(cnf)
-        # Decode them.
-        return scenario.decodeSATModel(model) if model is not None else None
+        # Decode them (in the encoding of the axioms).
+        return self.getScenario(axioms).decodeSATModel(model, self._axiomsEncoding(axioms)) if model is not None else None
 
     
-    def _doesRuleSatisfy(self, cnf, rule: AbstractRule) -> bool:
+    def _doesRuleSatisfy(self, axioms, cnf, rule: AbstractRule) -> bool:
         # First, we encode the rule as a list of literals (describing which alternatives win in which scenarios).
         # Then, we append, to the instances-cnf, a clause for every such literal.
-        for literal in rule.as_SAT(self.encoding):
-            cnf.append([literal])
+        # Up to renaming the alternatives, a rule which is not neutral gives contradicting literals.
+        cnf = chain(cnf, ([literal] for literal in rule.as_SAT(self._axiomsEncoding(axioms))))
 
         # The resulting cnf is satisfiable iff the SCF satisfies the instances.
 
         return self._isSatisfiable(cnf)
 
     
-    def enumerateMUSes(self, instances: Set[Instance]) -> Iterator[Set[Instance]]:
-
-        # First, we assign, to each instance, a unique index.
+    def enumerateMUSes(self, instances: Set[Instance], hard: Set[Instance] = frozenset()) -> Iterator[Set[Instance]]:
+
+        # First, we encode the instances, and simplify their clauses (see simplify_groups): every set of instances stays
+        # (un)satisfiable, so the MUSes are the same. Instances left without clauses are in no MUS: they are left out.
+        groups = simplify_groups({instance : clauses(self._encodeInstance(instance)) for instance in set(instances) | set(hard)})
+
+        # If all the instances are satisfiable together, there is no MUS (and MARCO would wait forever for one).
+        if self._isSatisfiable(chain.from_iterable(groups.values())):
+            return
+
+        # The clauses of the hard instances are in every subset: they are all together in the hard group.
+        hard_clauses = [clause for instance in hard if instance in groups for clause in groups.pop(instance)]
+        if hard_clauses and not self._isSatisfiable(hard_clauses):
+            # Then, the only MUS is the empty set.
+            yield set()
+            return
+        if not groups:
+            return
+
+        # Then, we assign, to each instance, a unique index.
         # Note that MARCO (our MUS enumerator) requires to index CNFs starting from one. Hence the +1.
-        indexed_instances = {i+1:instance for i, instance in enumerate(instances)}
+        indexed_instances = {i+1:instance for i, instance in enumerate(groups)}
 
-        # Then, we encode said uniquely-indexed instances as a DIMACS-style gCNF (group CNF).
-        # See https://people.sc.fsu.edu/~jburkardt/data/cnf/cnf.html for more details.
-        gcnf_string = self._getGCNF(indexed_instances)
+        # Then, we renumber the variables of their clauses, and give them to MARCO as groups (one per instance).
+        # MARCO loads them in its solvers directly: no gcnf file is written or parsed.
+        # Group 0 is the hard one (if there is any).
+        indexed_cnfs = {i:groups[instance] for i, instance in indexed_instances.items()}
+        if hard_clauses:
+            indexed_cnfs[0] = hard_clauses
+        nVariables, indexed_groups = self._getGroups(indexed_cnfs)
 
+        marco_gen = enumerate_groups(nVariables, indexed_groups, ['--verbose', '--bias', 'MUSes'])
         try:
-            # The "x" option creates a file, and throws an error if the file already exists.
-            # We do this because at the end of the execution we remove the file, and we do not want to delete pre-existing files...
-            file = open(self.FILE_NAME, "x")
-            file.write(gcnf_string)
-            file.close()
-
-            marco_args_list = [self.FILE_NAME, '--verbose', '--bias', 'MUSes']
-
-            marco_args = parse_args(marco_args_list)
-            # generator can be saved in a variable to call .close() later
-            marco_gen = enumerate_with_args(marco_args)
-
             # Every line of the output of the subprocess is an MUS.
             for result in marco_gen:
                 # Only care for MUSes (first argument is `U`)
@@ -200,60 +266,226 @@ class SAT(AbstractReasoner):
         finally:
             # Close the generator.
             marco_gen.close()
-            # Remove the created file.
-            os.remove(self.FILE_NAME)
 
 
+    def enumerateSmallestMUSes(self, instances: Set[Instance], hard: Set[Instance] = frozenset()) -> Iterator[Set[Instance]]:
+
+        """Enumerate the MUSes of the input instances in order of size, smallest first (see enumerateMUSes).
+
+        Unlike MARCO, which finds MUSes in no particular order, this computes minimum hitting sets of the correction
+        sets found so far (implicit hitting sets, see pysat.examples.optux): the first MUS is a smallest one."""
+
+        # Each instance has its own selector.
+        return (set(MUS) for MUS in self._minimalSelections(instances, hard, lambda instance: (instance,)))
+
+    def _minimalSelections(self, instances: Set[Instance], hard: Set[Instance], selectors) -> Iterator[List]:
+        """Enumerate the minimal sets of selectors such that the instances they select are unsatisfiable, smallest first.
+
+        Every instance (but the hard ones, which are always selected) is selected by a set of hashable objects, given by
+        the function selectors (e.g., its profiles): its clauses only hold if all of these objects are selected. The sets
+        of objects are the minimum hitting sets of the correction sets found so far (implicit hitting sets, see
+        pysat.examples.optux). Nothing is returned if the instances are satisfiable."""
+
+        # First, as in enumerateMUSes, we simplify the clauses of the instances, and put aside those of the hard ones.
+        groups = simplify_groups({instance : clauses(self._encodeInstance(instance)) for instance in set(instances) | set(hard)})
+        if self._isSatisfiable(chain.from_iterable(groups.values())):
+            return
+        hard_clauses = [clause for instance in hard if instance in groups for clause in groups.pop(instance)]
+        if hard_clauses and not self._isSatisfiable(hard_clauses):
+            yield []
+            return
+
+        # Then, we give a variable to every object: these are the soft clauses (of weight one), guarding the clauses.
+        formula = WCNF()
+        top = max((abs(literal) for cnf in chain(groups.values(), [hard_clauses]) for clause in cnf for literal in clause), default = 0)
+        variables = {}
+        # MUSes are given as (1-based) indexes of soft clauses: the objects of these indexes.
+        objects = [None]
+        for clause in hard_clauses:
+            formula.append(clause)
+        for instance, cnf in groups.items():
+            guard = []
+            for item in selectors(instance):
+                if item not in variables:
+                    top += 1
+                    variables[item] = top
+                    formula.append([top], weight = 1)
+                    objects.append(item)
+                guard.append(-variables[item])
+            for clause in cnf:
+                formula.append(list(clause) + guard)
+
+        with OptUx(formula) as enumerator:
+            for MUS in enumerator.enumerate():
+                yield [objects[i] for i in MUS]
+
     
-    def _getGCNF(self, indexed_instances):
+    def _getGroups(self, indexed_cnfs):
 
-        """Encode a set of (indexed) instances as a DIMACS-style group CNF.
+        """Number the variables of (indexed) groups of clauses from one, as MARCO requires.
 
             Parameters
             ----------
-            indexed_instances : Dict[int, Instance]
-                A dictionary mapping integers to instances.
+            indexed_cnfs : Dict[int, List[List[int]]]
+                A dictionary mapping integers to lists of clauses (e.g., the encodings of instances).
 
             Returns
             -------
-            str
-                A DIMACS-style group CNF (gcnf). The indexes of the clauses in this file match the indexes in the indexed_instances object.
+            Tuple[int, Dict[int, array]]
+                The number of variables, and a dictionary mapping the same integers to the renumbered clauses,
+                as flat arrays of 0-terminated clauses (see CNFsolvers.GroupCNF).
         """
 
-        # Get the (indexed) cnfs.
-        indexed_cnfs = {i:inst.as_SAT(self.encoding) for i, inst in indexed_instances.items()}
-
-        # Count the number of unique propositional variables.
-        variables = set()
-        for cnf in indexed_cnfs.values():
-            for clause in cnf:
-                # We get the absolute values because we only care about the variables, not the literals.
-                variables.update(map(abs, clause))
-
-        new_var = {var:i+1 for i, var in enumerate(variables)}
-
+        new_var = {}
+        indexed_groups = {}
         for index, cnf in indexed_cnfs.items():
-            new_cnf = []
+            group = indexed_groups[index] = array('i')
             for clause in cnf:
-                new_clause = [(1 if val>0 else -1)*new_var[abs(val)] for val in clause]
-                new_cnf.append(new_clause)
-            indexed_cnfs[index] = new_cnf
-
-        nVariables = len(variables)
-        nGroups = len(indexed_cnfs)
-        nClauses   = sum(map(len, indexed_cnfs.values()))
-
-        # file header
-        gcnf_string = "p gcnf " + str(nVariables) + " " + str(nClauses) + " " + str(nGroups) + "\n"
-
-        for index in indexed_instances.keys():
-            # encode each instance (group of clauses)
-            # in DIMACS-style gCNFS, we need to assign a unique index to every group of clauses.
-            for clause in indexed_cnfs[index]:
-                line = f"{{{index}}} "
                 for literal in clause:
-                    line += f"{literal} "
-                line += "0 \n"
-                gcnf_string += line
+                    variable = new_var.get(abs(literal))
+                    if variable is None:
+                        variable = new_var[abs(literal)] = len(new_var) + 1
+                    group.append(variable if literal > 0 else -variable)
+                group.append(0)
+
+        return len(new_var), indexed_groups
+
+class IncrementalSAT(SAT):
+
+    """SAT reasoner keeping one solver, to which instances are added as they come. See the SAT class for more details.
+
+    The clauses of every instance are guarded by a selector, a fresh variable of the solver (they become s -> C):
+    a set of instances is checked by assuming the selectors of its instances. Hence, across the checks of a search
+    (where the instances of a depth include those of the previous one), every instance is encoded and added once,
+    and the solver keeps what it learnt. When a set of instances is unsatisfiable, the solver also gives a subset
+    of it which is already unsatisfiable (see core): MUS enumeration starts from it."""
+
+    def __init__(self, encoding, compact: bool = False, executor = None, quotient: bool = True):
+        super().__init__(encoding, compact, executor, quotient)
+        self._reset()
+
+    def _reset(self):
+        """Start again with an empty solver."""
+        self._solver = None
+        # The variables of the solver: the ones of the encoding, and the selectors of the instances.
+        self._variables = {}
+        self._selectors = {}
+        # The unsatisfiable subset of the instances of the last check (if they were unsatisfiable).
+        self._core = None
+
+    def _newVariable(self) -> int:
+        return len(self._variables) + len(self._selectors) + 1
+
+    def _selector(self, instance: Instance) -> int:
+        """Return the selector of an instance, adding the instance to the solver the first time."""
+        try:
+            return self._selectors[instance]
+        except KeyError:
+            pass
+        if self._solver is None:
+            self._solver = pySAT()
+
+        # The variables of the encoding are numbered again, so that the selectors never clash with them
+        # (e.g., with auxiliary variables created later).
+        guarded = array('i')
+        for literal in self._encodeInstance(instance):
+            if literal:
+                variable = self._variables.get(abs(literal))
+                if variable is None:
+                    variable = self._variables[abs(literal)] = self._newVariable()
+                guarded.append(variable if literal > 0 else -variable)
+            else:
+                guarded.append(0)
+        selector = self._selectors[instance] = self._newVariable()
+        for clause in clauses(guarded):
+            clause.append(-selector)
+            self._solver.add_clause(clause)
+        return selector
 
-        return gcnf_string
+    def checkInstances(self, instances: Set[Instance]) -> bool:
+        assumptions = [self._selector(instance) for instance in instances]
+        if self._solver is None or self._solver.solve(assumptions = assumptions):
+            self._core = None
+            return True
+        core = set(self._solver.get_core())
+        self._core = {instance for instance in instances if self._selectors[instance] in core}
+        return False
+
+    def core(self, instances: Set[Instance]) -> Set[Instance]:
+        """Return an unsatisfiable subset of a set of instances, or None if they are satisfiable."""
+        if self._core is None or not self._core <= instances:
+            self.checkInstances(instances)
+        return self._core
+
+    def _shrink(self, instances: Set[Instance], hard: Set[Instance] = frozenset()) -> Set[Instance]:
+        """Return an MUS of an unsatisfiable set of instances, removing its instances one at a time (deletion-based).
+
+        The hard instances are never removed, and they are not returned (see enumerateMUSes)."""
+        hard = list(hard)
+        mus = [instance for instance in instances if instance not in hard]
+        i = 0
+        while i < len(mus):
+            candidate = mus[:i] + mus[i+1:]
+            if self.checkInstances(candidate + hard):
+                # Without this instance, the others are satisfiable: it is in the MUS.
+                i += 1
+            else:
+                # Otherwise, it is not needed, and neither are the instances outside the core.
+                mus = [instance for instance in candidate if instance in self._core]
+        return set(mus)
+
+    def enumerateMUSes(self, instances: Set[Instance], hard: Set[Instance] = frozenset()) -> Iterator[Set[Instance]]:
+        # The core of the instances is unsatisfiable: shrinking it, we get the first MUS without enumerating.
+        core = self.core(set(instances) | set(hard))
+        if core is None:
+            # They are satisfiable: there is no MUS.
+            return
+        first = self._shrink(core, hard)
+        yield set(first)
+        # Then, we enumerate the other ones.
+        for MUS in super().enumerateMUSes(instances, hard):
+            if MUS != first:
+                yield MUS
+
+    def __getstate__(self):
+        """Return the pickling information, leaving out the solver (which is built again when needed)."""
+        state = self.__dict__.copy()
+        for attribute in ('_solver', '_variables', '_selectors', '_core'):
+            del state[attribute]
+        return state
+
+    def __setstate__(self, state):
+        """Unpickle the object."""
+        self.__dict__.update(state)
+        self._reset()
+
+class FewestProfilesSAT(IncrementalSAT):
+
+    """SAT reasoner enumerating MUSes by the number of profiles that they mention, fewest first, then by size.
+    See the IncrementalSAT class for more details.
+
+    The first MUS found is then an explanation mentioning the fewest profiles (see Justification.involved_profiles).
+    Profiles are selected rather than instances: an instance holds iff all the profiles it mentions are selected, and
+    the minimal sets of profiles whose instances are unsatisfiable are found smallest first (see _minimalSelections).
+    For each of them, the MUSes mentioning all of its profiles are then found smallest first (see enumerateSmallestMUSes).
+    Only the MUSes whose profiles form such a minimal set are enumerated: these include the ones with the fewest profiles."""
+
+    def enumerateMUSes(self, instances: Set[Instance], hard: Set[Instance] = frozenset()) -> Iterator[Set[Instance]]:
+        profiles = iter(self._minimalSelections(instances, hard, lambda instance: instance.mentions()))
+        selection = next(profiles, None)
+        while selection is not None:
+            # All the minimal sets of profiles of the same size (the next one is larger, or None).
+            selections = [frozenset(selection)]
+            selection = next(profiles, None)
+            while selection is not None and len(selection) == len(selections[0]):
+                selections.append(frozenset(selection))
+                selection = next(profiles, None)
+            # Their MUSes, all together smallest first.
+            yield from merge(*(self._MUSesMentioningAll(instances, hard, selected) for selected in selections), key = len)
+
+    def _MUSesMentioningAll(self, instances: Set[Instance], hard: Set[Instance], profiles) -> Iterator[Set[Instance]]:
+        """Enumerate the MUSes of the instances mentioning only the given profiles that mention all of them, smallest first."""
+        selected = {instance for instance in instances if instance.mentions() <= profiles}
+        for MUS in self.enumerateSmallestMUSes(selected, hard):
+            if set().union(*(instance.mentions() for instance in MUS)) >= profiles:
+                yield MUS
@@ -1,4 +1,5 @@
 from typing import List
+from array import array
 
 class SATEncodingHandler:
 
@@ -37,6 +38,110 @@ class SATEncodingHandler:
 
         return self._index2profileAlt[abs(i)]
 
+    def auxiliary(self, key) -> int:
+        """Return the index of the auxiliary variable identified by key (any hashable object), creating it the first time.
+
+        Auxiliary variables do not stand for a (profile, alternative) pair: they are used by compact encodings."""
+        try:
+            return self._profileAlt2index[('auxiliary', key)]
+        except KeyError:
+            self._counter += 1
+            self._profileAlt2index[('auxiliary', key)] = self._counter
+            return self._counter
+
+    def isAuxiliary(self, i: int) -> bool:
+        """Check whether a unique index is an auxiliary variable (see auxiliary)."""
+        return abs(i) not in self._index2profileAlt
+
+class RankedSATEncodingHandler:
+    """SAT encoding in which the index of a (profile, alternative) pair is computed, not stored.
+
+    The scenario must rank its profiles (that is, provide rankProfile and unrankProfile): the index of
+    (profile, alternative) is then rank(profile) * m + (index of alternative) + 1. Indexes are contiguous
+    and start from 1, and the handler does not grow with the number of encoded pairs.
+
+    Handlers of equal scenarios are equal, and encode (profile, alternative) pairs in the same way. Each handler numbers
+    its own auxiliary variables, identified by keys made of integers (e.g., ranks of profiles) and strings: they go
+    away with the handler, and keep no instance or profile alive. Compact encodings are only shared between handlers
+    with the same auxiliaryScope (see Instance.SATarray)."""
+
+    def __init__(self, scenario):
+        self._scenario = scenario
+        self._alternatives = tuple(sorted(scenario.alternatives))
+        self._alt2index = {alt : i for i, alt in enumerate(self._alternatives)}
+        # Auxiliary variables are numbered after all (profile, alternative) pairs.
+        self._nPairs = scenario.nProfiles * len(self._alternatives)
+        self._auxiliary = {}
+        self._auxiliaryScope = object()
+
+    @property
+    def scenario(self):
+        return self._scenario
+
+    @property
+    def auxiliaryScope(self):
+        """An object identifying the numbering of the auxiliary variables of this handler (see auxiliary)."""
+        return self._auxiliaryScope
+
+    def encode(self, profile, alternative) -> int:
+        """Given a profile and an alternative, return a unique index for these two."""
+        return self._scenario.rankProfile(profile) * len(self._alternatives) + self._alt2index[alternative] + 1
+
+    def decode(self, i: int):
+        """Given a unique index, return the corresponding profile and alternative."""
+        rank, alt = divmod(abs(i) - 1, len(self._alternatives))
+        return self._scenario.unrankProfile(rank), self._alternatives[alt]
+
+    def auxiliary(self, key: tuple) -> int:
+        """Return the index of the auxiliary variable identified by key (a tuple of integers and strings), creating it the first time.
+
+        Auxiliary variables do not stand for a (profile, alternative) pair: they are used by compact encodings."""
+        try:
+            return self._auxiliary[key]
+        except KeyError:
+            index = self._auxiliary[key] = self._nPairs + len(self._auxiliary) + 1
+            return index
+
+    def isAuxiliary(self, i: int) -> bool:
+        """Check whether a unique index is an auxiliary variable (see auxiliary)."""
+        return abs(i) > self._nPairs
+
+    def importAuxiliary(self, flat: array, key: tuple) -> array:
+        """Return a copy of a flat array of literals (see Instance.SATarray) encoded by an equal handler, possibly in another
+        process, where the auxiliary variables are replaced by auxiliary variables of this handler, identified by (*key, old index)."""
+        # Imported here, so that only parallel compact encodings need NumPy.
+        import numpy as np
+
+        literals = np.frombuffer(flat, dtype=np.intc).copy()
+        variables = np.abs(literals)
+        isAuxiliary = variables > self._nPairs
+        old = np.unique(variables[isAuxiliary])
+        new = np.array([self.auxiliary((*key, int(variable))) for variable in old], dtype=np.intc)
+        literals[isAuxiliary] = np.sign(literals[isAuxiliary]) * new[np.searchsorted(old, variables[isAuxiliary])]
+
+        imported = array('i')
+        imported.frombytes(literals.tobytes())
+        return imported
+
+    def __eq__(self, other):
+        return type(self) == type(other) and self._scenario == other._scenario
+
+    def __hash__(self):
+        return hash(self._scenario)
+
+class NeutralSATEncodingHandler(RankedSATEncodingHandler):
+    """Ranked SAT encoding of a scenario up to renaming the alternatives, for sets of axioms including Neutrality.
+
+    The scenario must also provide canonicalProfile, returning the representative of a profile (the same for all
+    profiles equal up to renaming the alternatives) and the renaming mapping the profile into it. The pair
+    (profile, x) is then encoded as (representative, renaming(x)) in the ranked encoding: only representatives
+    have variables. Under Neutrality, a rule is determined by its outcomes on the representatives."""
+
+    def encode(self, profile, alternative) -> int:
+        """Given a profile and an alternative, return the index of the corresponding pair of the representative of the profile."""
+        representative, mapping = self._scenario.canonicalProfile(profile)
+        return super().encode(representative, mapping[alternative])
+
 class ASPEncodingHandler:
 
     def __init__(self):
@@ -14,13 +14,25 @@ class VotingPreference(AbstractPreference, tuple):
         """Return the top alternative in this order."""
         return self[0]
 
+    @property
+    def positions(self) -> Dict:
+        """Return a dictionary mapping every alternative to its position in this order (0 for the top one).
+
+        It is computed once, so that comparing alternatives does not require scanning the order."""
+        try:
+            return self._positions
+        except AttributeError:
+            self._positions = {alt : i for i, alt in enumerate(self)}
+            return self._positions
+
     def prefers(self, x, y) -> bool:
         """Check whether alternative x is better than y in this order."""
-        return self.index(x) < self.index(y)
+        positions = self.positions
+        return positions[x] < positions[y]
 
     def rank(self, x) -> int:
         """Return the rank of alternative x. Goes from 1 to m, where m is the number of alternatives."""
-        return self.index(x) + 1
+        return self.positions[x] + 1
 
     def __str__(self):
         return '>'.join(map(str, self))
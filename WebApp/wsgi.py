@@ -8,7 +8,6 @@ if sys.platform.startswith("linux"):
 
 
 MAX_TIME = 30  # maximum 30 seconds
-SHORTEST_OUT_OF = 15  # Find shortest justification (explanation-cardinality wise) among the first 15 you find
 
 ### FOR MULTIPLE WORKERS... (see flask documentation for celery) ###
 
@@ -135,25 +134,19 @@ def compute_justification(profile_name: str, axioms: list, outcome_names: list):
             QuasiTiedLoser(scenario),
         }
 
-        shortest = None  # Shotest (cardinality of the explanation) justification will be stored here
-        # Iterate over up to 5 justifications with a depth of 3, using heuristics
+        shortest = None  # Shortest (fewest profiles, then fewest instances) justification will be stored here
+        # Find a justification with a depth of 3, using heuristics: explanations are enumerated by the number of
+        # profiles they mention, then by size, so the first one we find is the shortest (at the smallest depth with one).
         for justification in problem.solve(
-            extract="SAT",
+            extract="fewestProfilesSAT",
             nontriviality=["from_folder", "known_faults"],
             depth=3,
             heuristics=True,
-            maximum=SHORTEST_OUT_OF,
+            maximum=1,
             derivedAxioms=derived,
             nb_folder="knownbases",
         ):
-            # Memorise the shortest justification here
-            if shortest is None:
-                shortest = justification
-            else:
-                shortest = min(
-                    (shortest, justification),
-                    key=lambda j: (len(j.involved_profiles), len(j)),
-                )
+            shortest = justification
 
         # No justification found: present failure message
         if shortest is None:
@@ -1,8 +1,22 @@
 import unittest
+import pickle
+import tempfile
+import random
+import sys
+
+import numpy
 
 from math import factorial
+from itertools import combinations, permutations
+from concurrent.futures import ProcessPoolExecutor
 
 import COMSOC.anonymous as theory
+from COMSOC.reasoning import SAT, IncrementalSAT
+from COMSOC.problems import JustificationProblem
+from COMSOC.helpers import clauses, powerset, simplify_groups
+from COMSOC.just.generation import InstanceGraph, InstanceIndex, InstanceView
+from COMSOC.cache import InstanceCache
+from COMSOC.MARCO.src.marco.marco import parse_args, enumerate_with_args, enumerate_groups
 
 class TestAnonymous(unittest.TestCase):
 
@@ -30,6 +44,16 @@ class TestAnonymous(unittest.TestCase):
             self.assertEqual(len(scenario.preferences), factorial(m))
             self.assertEqual(len(scenario.outcomes), 2**m-1)
         
+    def test_preferences(self):
+        """Test whether preferences are interned and compare alternatives correctly."""
+
+        preference = theory.Preference(('2', '0', '1'))
+        self.assertIs(preference, theory.Preference(x for x in '2>0>1'.split('>')))
+        self.assertIn(preference, self.scenarios[(3, 3)].preferences)
+        self.assertEqual(preference.id, 4)
+        self.assertTrue(preference.prefers('0', '1'))
+        self.assertEqual([preference.rank(x) for x in '012'], [2, 3, 1])
+
     def test_profileGeneration(self):
         """Test whether the scenarios generate the expected amount of profiles."""
 
@@ -40,6 +64,21 @@ class TestAnonymous(unittest.TestCase):
         self.assertEqual(len(list(scenario3x3.profilesUpToSize(2)) + list(scenario3x3.profilesOfSize(3))),\
             scenario3x3.nProfiles)
 
+        # Streaming (without cache) yields every profile exactly once, in the same order.
+        streaming = theory.Scenario(3, map(str, range(3)), cacheProfiles=False)
+        streamed = list(streaming.profiles)
+        self.assertEqual(len(set(streamed)), len(streamed))
+        self.assertEqual(streamed, list(scenario3x3.profiles))
+        self.assertEqual(streaming._profilesByLength, {})
+
+        # Profiles read from a store, also after pickling (as when sending the scenario to a worker).
+        with tempfile.TemporaryDirectory() as store:
+            stored = theory.Scenario(3, map(str, range(3)), store=store)
+            self.assertEqual(list(stored.profiles), streamed)
+            unpickled = pickle.loads(pickle.dumps(stored))
+            self.assertEqual(list(unpickled.profilesOfSize(2)), list(scenario3x3.profilesOfSize(2)))
+            self.assertIsInstance(unpickled.propertyTable.counts, numpy.memmap)
+
     def test_satEncoding(self):
         """Test whether the SAT encoding of a scenario behaves as expected."""
 
@@ -67,12 +106,8 @@ class TestAnonymous(unittest.TestCase):
                     else:
                         model.append(-e)
 
-            # Check shape of ENCODING dictionary
-
-            # Do they start from 1? (Important for MARCO solver)
-            self.assertIn(1, scenario.SATencoding._profileAlt2index.values())
-            # Is it contiguous?
-            self.assertEqual(max(scenario.SATencoding._profileAlt2index.values()), len(scenario.SATencoding._profileAlt2index.values()))
+            # Check shape of the encoding: do they start from 1 (important for MARCO solver) and are they contiguous?
+            self.assertEqual(set(indexes), set(range(1, scenario.nProfiles * len(scenario.alternatives) + 1)))
 
             # Try decoding.
             for index, (profile, alternative) in indexes.items():
@@ -120,11 +155,498 @@ class TestAnonymous(unittest.TestCase):
                 self.assertEqual(profile, theory.Profile(dict(profile.ballotsWithCounts())))
                 self.assertEqual(len(profile), sum((c for _, c in profile.ballotsWithCounts())))
 
+        # Majority-based properties.
+        profile = scenario3x3.get_profile('2:0>1>2,1:2>1>0')
+        self.assertEqual(profile.condorcetWinner(), '0')
+        self.assertEqual(profile.majorityContest('1', '2'), {'1'})
+        self.assertEqual(profile.paretoDominated(), set())
+        self.assertEqual(scenario3x3.get_profile('0>1>2,1>0>2').paretoDominated(), {'2'})
+        self.assertTrue(scenario3x3.get_profile('0>1>2,2>1>0').isPerfectTie())
+        self.assertFalse(scenario3x3.get_profile('0>1>2,1>2>0,2>0>1').hasCondorcetWinner())
+
+        # The property table of the scenario agrees with the properties of the single profiles
+        # (taken from a streaming scenario, so that the table does not fill their caches).
+        for scenario in (scenario3x3, scenario3x4):
+            table = scenario.propertyTable
+            fresh = theory.Scenario(scenario.nVoters, scenario.alternatives, cacheProfiles=False)
+            self.assertEqual(dict(table.condorcetWinners()),\
+                {p : p.condorcetWinner() for p in fresh.profiles if p.hasCondorcetWinner()})
+            self.assertEqual(set(table.perfectTies()), {p for p in fresh.profiles if p.isPerfectTie()})
+            self.assertEqual(dict(table.paretoDominatedAlternatives()),\
+                {p : p.paretoDominated() for p in fresh.profiles if p.paretoDominated()})
+
         #TODO: Finish here
 
         #TODO: Check whether, if I modify something from an iterable (e.g., preferences from profile), I don't edit the profile?
 
 
+    def test_countVectors(self):
+        """Test whether profiles are correctly represented as count vectors."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+
+        profile = scenario3x3.get_profile('2:2>1>0,1:0>1>2')
+        # Preferences are ranked lexicographically: 0>1>2 is the first one, 2>1>0 the last one.
+        self.assertEqual(profile.counts, (1, 0, 0, 0, 0, 2))
+        self.assertEqual(str(profile), "#1:0>1>2, #2:2>1>0")
+
+        for p in scenario3x3.profiles:
+            for q in scenario3x3.profilesOfSize(1):
+                merged = p.mergeProfile(q)
+                self.assertEqual(merged, theory.Profile(dict(p.ballotsWithCounts()) | {q.anyBallot(): p.as_dict().get(q.anyBallot(), 0) + 1}))
+                self.assertEqual(hash(merged), hash(theory.Profile(merged.as_dict())))
+
+    def test_profileRanking(self):
+        """Test whether ranking profiles is a bijection onto 0, ..., nProfiles - 1."""
+
+        for scenario in self.scenarios.values():
+            ranks = set()
+            for profile in scenario.profiles:
+                rank = scenario.rankProfile(profile)
+                ranks.add(rank)
+                self.assertEqual(scenario.unrankProfile(rank), profile)
+
+            self.assertEqual(ranks, set(range(scenario.nProfiles)))
+
+        # Within a size, profiles are ranked like combinations with replacement of the ranked preferences.
+        scenario3x3 = self.scenarios[(3, 3)]
+        self.assertEqual(scenario3x3.rankProfile(scenario3x3.get_profile('0>1>2')), 0)
+        self.assertEqual(scenario3x3.rankProfile(scenario3x3.get_profile('2>1>0')), 5)
+        self.assertEqual(scenario3x3.rankProfile(scenario3x3.get_profile('2:0>1>2')), 6)
+        self.assertEqual(scenario3x3.rankProfile(scenario3x3.get_profile('3:2>1>0')), scenario3x3.nProfiles - 1)
+
+    def test_canonicalForm(self):
+        """Test whether profiles equal up to renaming the alternatives have the same canonical form."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+
+        profile = scenario3x3.get_profile('2:0>1>2,1:1>2>0')
+        renamed = scenario3x3.get_profile('2:2>0>1,1:0>1>2')
+        counts, mapping = profile.canonicalForm()
+        self.assertEqual(renamed.canonicalForm()[0], counts)
+        self.assertEqual(theory.Profile({theory.Preference(mapping[x] for x in ballot) : count\
+            for ballot, count in profile.ballotsWithCounts()}).counts, counts)
+        self.assertNotEqual(scenario3x3.get_profile('3:0>1>2').canonicalForm()[0], counts)
+
+        # The automorphisms of a profile map it into itself, starting with the identity.
+        symmetric = scenario3x3.get_profile('0>1>2,0>2>1')
+        self.assertEqual(symmetric.automorphisms(), [{'0' : '0', '1' : '1', '2' : '2'}, {'0' : '0', '1' : '2', '2' : '1'}])
+
+    def test_neutralityInstances(self):
+        """Test whether Neutrality instances relate exactly the pairs of profiles equal up to renaming, by a valid renaming."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+        neutrality = theory.axioms.Neutrality(scenario3x3)
+
+        # Rename the ballots one by one, and read the renamed profile back from its description.
+        def rename(profile, mapping):
+            return scenario3x3.get_profile(','.join(f"{count}:" + '>'.join(mapping[a] for a in ballot)\
+                for ballot, count in profile.ballotsWithCounts()))
+
+        # Brute force: all pairs of distinct profiles, and all renamings of the alternatives.
+        alternatives = sorted(scenario3x3.alternatives)
+        mappings = [dict(zip(alternatives, image)) for image in permutations(alternatives)]
+        expected = set()
+        for size in range(1, scenario3x3.nVoters + 1):
+            for p, q in combinations(scenario3x3.profilesOfSize(size), 2):
+                if any(rename(p, mapping) == q for mapping in mappings):
+                    expected.add(frozenset((p, q)))
+
+        instances = neutrality.getInstances()
+        self.assertEqual(len(instances), len(expected))
+        self.assertEqual({instance.mentions() for instance in instances}, expected)
+        for instance in instances:
+            self.assertEqual(rename(instance._base, instance._mapping), instance._mapped)
+
+    def test_positiveResponsivenessInstances(self):
+        """Test whether Positive Responsiveness instances are exactly the pairs of profiles where the support of an alternative is raised."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+
+        def positions(profile, x):
+            # For every ballot without x, the sorted positions of x in the ballots of the profile.
+            result = {}
+            for ballot in profile.allBallots():
+                result.setdefault(tuple(y for y in ballot if y != x), []).append(ballot.rank(x))
+            return {cleaned : sorted(ranks) for cleaned, ranks in result.items()}
+
+        expected = set()
+        for size in range(1, scenario3x3.nVoters + 1):
+            for base in scenario3x3.profilesOfSize(size):
+                for raised in scenario3x3.profilesOfSize(size):
+                    for x in scenario3x3.alternatives:
+                        p, q = positions(base, x), positions(raised, x)
+                        if base != raised and {c : len(r) for c, r in p.items()} == {c : len(r) for c, r in q.items()} and\
+                            all(r <= b for cleaned in p for r, b in zip(q[cleaned], p[cleaned])):
+                            expected.add((base, x, raised))
+
+        instances = theory.axioms.PositiveResponsiveness(scenario3x3).getInstances()
+        self.assertEqual({(i._base, i._alternative, i._raised) for i in instances}, expected)
+        self.assertEqual(len(instances), len(expected))
+
+    def test_reinforcementInstances(self):
+        """Test whether Reinforcement instances are streamed exactly once each, and encoded lazily."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+        reinforcement = theory.axioms.Reinforcement(scenario3x3)
+
+        expected = set()
+        for p1 in scenario3x3.profiles:
+            for p2 in scenario3x3.profilesUpToSize(scenario3x3.nVoters - len(p1)):
+                expected.add(theory.axioms.ReinforcementInstance(p1.mergeProfile(p2), p1, p2))
+
+        # Every profile is split in every pair of subprofiles exactly once.
+        for profile in scenario3x3.profiles:
+            splits = list(reinforcement._binaryPartitions(profile))
+            self.assertEqual(len(splits), len({frozenset(split) for split in splits}))
+            self.assertEqual({frozenset(split) for split in splits},\
+                {frozenset(instance.mentions() - {profile}) for instance in expected if instance._profile == profile})
+
+        streamed = list(reinforcement.iterInstances())
+        self.assertEqual(len(streamed), len(expected))
+        self.assertEqual(set(streamed), expected)
+
+        # Borda satisfies Reinforcement, and the SAT reasoner consumes the clauses as they are generated.
+        reasoner = SAT(scenario3x3.SATencoding)
+        self.assertTrue(reasoner.checkAxioms({reinforcement}))
+        self.assertTrue(reasoner.checkRule({reinforcement}, theory.rules.Borda(scenario3x3)))
+
+    def test_compactReinforcementEncoding(self):
+        """Test whether the compact encoding of Reinforcement allows exactly the same outcomes as the standard one."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+        encoding = scenario3x3.SATencoding
+        p1, p2 = scenario3x3.get_profile('0>1>2'), scenario3x3.get_profile('1>2>0')
+        instance = theory.axioms.ReinforcementInstance(p1.mergeProfile(p2), p1, p2)
+
+        standard, compact = instance.as_SAT(encoding), instance.as_compact_SAT(encoding)
+        self.assertLess(len(compact), len(standard))
+        auxiliary = {abs(l) for clause in compact for l in clause if encoding.isAuxiliary(l)}
+        self.assertEqual(len(auxiliary), 1)
+
+        # Equal instances built separately share their auxiliary variable, which does not keep them alive.
+        other = theory.axioms.ReinforcementInstance(p1.mergeProfile(p2), p1, p2)
+        references = sys.getrefcount(other)
+        self.assertEqual(other.as_compact_SAT(encoding), compact)
+        self.assertEqual(sys.getrefcount(other), references)
+        # Handlers of equal scenarios number auxiliary variables on their own: compact arrays are not shared.
+        otherEncoding = theory.Scenario(3, map(str, range(3))).SATencoding
+        self.assertEqual(otherEncoding, encoding)
+        self.assertEqual(instance.SATarray(otherEncoding), instance.SATarray(encoding))
+        self.assertIsNot(instance.SATarray(otherEncoding, True), instance.SATarray(encoding, True))
+
+        # Fixing the outcomes of the three profiles, the compact encoding is satisfiable iff the standard one is.
+        variables = sorted({abs(l) for clause in standard for l in clause})
+        for values in range(2 ** len(variables)):
+            assignment = {v for i, v in enumerate(variables) if values >> i & 1}
+            satisfies = lambda cnf, true: all(any((l > 0) == (abs(l) in true) for l in clause) for clause in cnf)
+            self.assertEqual(satisfies(standard, assignment),\
+                any(satisfies(compact, assignment | aux) for aux in (set(), auxiliary)))
+
+        # Both reasoners agree, and decode models with auxiliary variables.
+        axioms = {theory.axioms.Reinforcement(scenario3x3), theory.axioms.Faithfulness(scenario3x3)} | scenario3x3.defaultAxioms
+        self.assertTrue(SAT(encoding, compact = True).checkAxioms(axioms))
+        rule = SAT(encoding, compact = True).findRule(axioms)
+        self.assertTrue(SAT(encoding).checkRule(axioms, rule))
+
+    def test_SATarrays(self):
+        """Test whether instances store their encoding as flat arrays, and whether justifications are still found."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+        encoding = scenario3x3.SATencoding
+        profile = scenario3x3.get_profile('0>1>2,1>2>0,2>0>1')
+
+        for instance in theory.axioms.Neutrality(scenario3x3).getInstancesMentioning(profile):
+            flat = instance.SATarray(encoding)
+            self.assertIs(instance.SATarray(encoding), flat)
+            self.assertEqual(list(clauses(flat)), instance.as_SAT(encoding))
+
+        corpus = theory.get_axioms(scenario3x3, ['Pareto', 'Neutrality', 'Faithfulness', 'Reinforcement', 'Cancellation'])
+        problem = JustificationProblem(profile, scenario3x3.get_outcome('0,1,2'), corpus)
+        justifications = list(problem.solve(extract = 'SAT', nontriviality = 'SAT', depth = 2))
+        self.assertTrue(justifications)
+        for justification in justifications:
+            self.assertIn('Neutrality', set(map(str, justification.normative)))
+
+    def test_instanceIndex(self):
+        """Test whether the instance index generates the instances mentioning a profile once, and shares them."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+        neutrality = theory.axioms.Neutrality(scenario3x3)
+        profile = scenario3x3.get_profile('2:0>1>2,1:1>2>0')
+
+        index = InstanceIndex.of(neutrality, False)
+        self.assertIs(InstanceIndex.of(theory.axioms.Neutrality(scenario3x3), False), index)
+        self.assertIsNot(InstanceIndex.of(neutrality, True), index)
+
+        instances = index.instancesMentioning(profile)
+        self.assertEqual({instance.materialise() for instance in instances}, neutrality.getInstancesMentioning(profile))
+        self.assertTrue(all(instance.created_by == neutrality for instance in instances))
+        # Instances are stored packed, and handed out as views, encoded like the instances themselves.
+        self.assertTrue(all(isinstance(instance, InstanceView) for instance in instances))
+        for instance in instances:
+            self.assertEqual(instance.as_SAT(scenario3x3.SATencoding), instance.materialise().as_SAT(scenario3x3.SATencoding))
+            self.assertEqual(str(instance), str(instance.materialise()))
+            self.assertEqual(instance.materialise()._unpack(scenario3x3, instance.materialise()._pack(scenario3x3)), instance.materialise())
+        # The same objects are returned, also when reached from the other profile.
+        for instance in instances:
+            for other in instance.mentions():
+                self.assertIn(instance, index.instancesMentioning(other))
+            self.assertTrue(any(instance is again for again in index.instancesMentioning(profile)))
+
+        # Heuristic generation depends on the heuristic information.
+        heuristic = InstanceIndex.of(neutrality, True)
+        self.assertEqual(heuristic.instancesMentioning(profile, {"reachedByNeutrality": True}), set())
+        self.assertEqual({instance.materialise() for instance in heuristic.instancesMentioning(profile, {"reachedByNeutrality": False})},\
+            {instance.materialise() for instance in instances})
+
+        # Only the most recently used indexes are kept.
+        maximum, InstanceIndex.maximum = InstanceIndex.maximum, 2
+        try:
+            InstanceIndex.of(neutrality, False)
+            pareto = InstanceIndex.of(theory.axioms.Pareto(scenario3x3), False)
+            self.assertIs(InstanceIndex.of(neutrality, False), index)
+            self.assertIsNot(InstanceIndex.of(neutrality, True), heuristic)
+            self.assertIs(InstanceIndex.of(neutrality, False), index)
+            self.assertIsNot(InstanceIndex.of(theory.axioms.Pareto(scenario3x3), False), pareto)
+        finally:
+            InstanceIndex.maximum = maximum
+
+    def test_instanceCache(self):
+        """Test whether instances and encodings are stored on disk, read back by other scenarios, and evicted."""
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = InstanceCache.use(directory)
+            try:
+                scenario3x3 = self.scenarios[(3, 3)]
+                profile = scenario3x3.get_profile('2:0>1>2,1:1>2>0')
+                expected = theory.axioms.Neutrality(scenario3x3).getInstancesMentioning(profile)
+
+                InstanceIndex.clear()
+                generated = InstanceIndex.of(theory.axioms.Neutrality(scenario3x3), False).instancesMentioning(profile)
+
+                # An equal scenario (as in a new process) reads the instances, and their encodings, from disk.
+                InstanceIndex.clear()
+                scenario = theory.Scenario(3, map(str, range(3)))
+                index = InstanceIndex.of(theory.axioms.Neutrality(scenario), False)
+                loaded = index.instancesMentioning(profile)
+                self.assertEqual({instance.materialise() for instance in loaded}, expected)
+                self.assertTrue(all(instance is not other for instance in loaded for other in generated))
+                # The index keeps the encodings read from disk.
+                _, starts, _ = index._encoded[False]
+                self.assertTrue(all(start >= 0 for start in starts))
+                for instance in loaded:
+                    self.assertEqual(list(clauses(instance.SATarray(scenario.SATencoding))),\
+                        instance.materialise().as_SAT(scenario.SATencoding))
+
+                # Axioms are encoded once, and the reasoner answers the same.
+                axioms = {theory.axioms.Neutrality(scenario), theory.axioms.Pareto(scenario)}
+                self.assertTrue(SAT(scenario.SATencoding).checkAxioms(axioms))
+                self.assertTrue(SAT(scenario3x3.SATencoding).checkAxioms(axioms))
+                for axiom in axioms:
+                    self.assertEqual(list(clauses(cache.axiomCNF(axiom))), list(axiom.as_SAT(scenario.SATencoding)))
+
+                # A small cache evicts the least recently used entries.
+                bound = 3 * sum(size for _, size in cache._entries().values())
+                cache = InstanceCache.use(directory, maxBytes=bound)
+                InstanceIndex.clear()
+                index = InstanceIndex.of(theory.axioms.Neutrality(scenario), False)
+                for other in scenario.profilesOfSize(3):
+                    index.instancesMentioning(other)
+                self.assertLessEqual(sum(size for _, size in cache._entries().values()), bound)
+            finally:
+                InstanceCache.disable()
+                InstanceIndex.clear()
+
+    def test_parallelInstances(self):
+        """Test whether an executor generates and encodes the same instances, by ranges of ranks."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+        encoding = scenario3x3.SATencoding
+        with ProcessPoolExecutor(2) as executor:
+            for axiom in (theory.axioms.Neutrality(scenario3x3), theory.axioms.Reinforcement(scenario3x3),\
+                theory.axioms.PositiveResponsiveness(scenario3x3), theory.axioms.Pareto(scenario3x3)):
+                axiom.shardSize = 10
+                instances = list(axiom.iterInstances(executor))
+                self.assertEqual(len(instances), len(set(instances)))
+                self.assertEqual(set(instances), axiom.getInstances())
+                self.assertEqual(sorted(map(sorted, axiom.as_SAT(encoding, executor = executor))),\
+                    sorted(map(sorted, axiom.as_SAT(encoding))))
+
+            # Auxiliary variables of compact encodings are numbered again, and do not clash.
+            scenario = theory.Scenario(6, map(str, range(3)))
+            axioms = {theory.axioms.Reinforcement(scenario), theory.axioms.Condorcet(scenario),\
+                theory.axioms.Faithfulness(scenario), theory.axioms.Cancellation(scenario)}
+            for axiom in axioms:
+                axiom.shardSize = 100
+            self.assertEqual(SAT(scenario.SATencoding, compact = True, executor = executor).checkAxioms(axioms),\
+                SAT(scenario.SATencoding).checkAxioms(axioms))
+
+    def test_neutralQuotient(self):
+        """Test whether axioms including Neutrality are encoded up to renaming the alternatives, with the same answers."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+        quotient = scenario3x3.neutralSATencoding
+
+        # Profiles equal up to renaming the alternatives share their variables.
+        p, q = scenario3x3.get_profile('0>1>2,1>2>0'), scenario3x3.get_profile('1>0>2,0>2>1')
+        mapping = theory.axioms.Neutrality(scenario3x3)._getMappingIfPermutable(p, q)
+        self.assertEqual({quotient.encode(p, x) for x in mapping}, {quotient.encode(q, mapping[x]) for x in mapping})
+
+        names = ["Faithfulness", "Reinforcement", "Cancellation", "Pareto", "Condorcet", "PositiveResponsiveness"]
+        for subset in combinations(names, 2):
+            axioms = theory.get_axioms(scenario3x3, list(subset) + ["Neutrality"]) | scenario3x3.defaultAxioms
+            reasoner, full = SAT(scenario3x3.SATencoding), SAT(scenario3x3.SATencoding, quotient = False)
+            self.assertIs(reasoner.quotientEncoding(axioms), quotient)
+            self.assertLess(sum(1 for _ in reasoner.encodeAxioms(axioms)), sum(1 for _ in full.encodeAxioms(axioms)))
+            self.assertEqual(reasoner.checkAxioms(axioms), full.checkAxioms(axioms))
+
+            # Rules found up to renaming are decoded on every profile.
+            if reasoner.checkAxioms(axioms):
+                self.assertTrue(full.checkRule(axioms, reasoner.findRule(axioms)))
+
+        axioms = theory.get_axioms(scenario3x3, ["Neutrality", "Reinforcement", "Faithfulness"])
+        self.assertIsNone(SAT(scenario3x3.SATencoding).quotientEncoding(axioms - {theory.axioms.Neutrality(scenario3x3)}))
+        for rule in (theory.rules.Borda(scenario3x3), theory.rules.Plurality(scenario3x3)):
+            self.assertTrue(SAT(scenario3x3.SATencoding).checkRule(axioms, rule))
+        # A rule which is not neutral.
+        favourite = theory.rules.AnonymousRule.from_function(lambda profile: {'0'}, scenario3x3)
+        self.assertFalse(SAT(scenario3x3.SATencoding).checkRule({theory.axioms.Neutrality(scenario3x3)}, favourite))
+
+    def test_simplifyGroups(self):
+        """Test whether simplifying a group CNF keeps every set of groups (un)satisfiable."""
+
+        # Pure literals (1, then 2, and 5) go with their clauses, and so does the tautology. Then, variable 3 only occurs
+        # in group 2 (an equivalence), where it is eliminated: only the two groups of the MUS are left.
+        groups = {1 : [[1, 2], [1, 2], [-2, 3]], 2 : [[-3, 4], [3, -4]], 3 : [[-4], [3, 5], [-3, 6, -6]], 4 : [[4]]}
+        self.assertEqual(simplify_groups(groups), {3 : [[-4]], 4 : [[4]]})
+
+        reasoner = SAT(None)
+        generator = random.Random(0)
+        for _ in range(100):
+            groups = {g : [[generator.choice((1, -1)) * generator.randint(1, 5) for _ in range(generator.randint(1, 3))]\
+                for _ in range(generator.randint(1, 4))] for g in range(4)}
+            simplified = simplify_groups(groups)
+            for subset in powerset(groups):
+                self.assertEqual(reasoner._isSatisfiable([clause for g in subset for clause in groups[g]]),\
+                    reasoner._isSatisfiable([clause for g in subset if g in simplified for clause in simplified[g]]))
+
+    def test_enumerateGroups(self):
+        """Test whether MARCO finds the same MUSes for clause groups given in memory as for the same groups in a gcnf file."""
+
+        groups = {1 : [[1], [2]], 2 : [[-1, -2]], 3 : [[-1]], 4 : [[3, -2]], 5 : [[-3]], 6 : [[1, 3]]}
+        nVariables, indexed_groups = SAT(None)._getGroups(groups)
+        self.assertEqual(nVariables, 3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/groups.gcnf"
+            with open(path, "w") as file:
+                file.write(f"p gcnf 3 {sum(map(len, groups.values()))} {len(groups)}\n")
+                for index, cnf in groups.items():
+                    file.writelines(f"{{{index}}} {' '.join(map(str, clause))} 0\n" for clause in cnf)
+            fromFile = {frozenset(indexes) for kind, _, indexes in enumerate_with_args(parse_args([path, '--verbose', '--bias', 'MUSes'])) if kind == 'U'}
+
+        inMemory = {frozenset(indexes) for kind, _, indexes in enumerate_groups(nVariables, indexed_groups, ['--verbose', '--bias', 'MUSes']) if kind == 'U'}
+        self.assertEqual(inMemory, fromFile)
+        self.assertEqual(inMemory, {frozenset({1, 2}), frozenset({1, 3}), frozenset({1, 4, 5}), frozenset({3, 5, 6})})
+
+    def test_hardGoal(self):
+        """Test whether extracting with the goal as a hard group finds the same justifications, and only explanations."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+        profile = scenario3x3.get_profile('0>1>2,1>2>0,2>0>1')
+        corpus = theory.get_axioms(scenario3x3, ['Pareto', 'Neutrality', 'Faithfulness', 'Reinforcement', 'Cancellation'])
+        problem = JustificationProblem(profile, scenario3x3.get_outcome('0,1,2'), corpus)
+
+        key = lambda justification: (frozenset(justification.normative), frozenset(justification.explanation))
+        hard = set(map(key, problem.solve(extract = 'SAT', nontriviality = 'SAT', depth = 2, hardGoal = True)))
+        soft = set(map(key, problem.solve(extract = 'SAT', nontriviality = 'SAT', depth = 2)))
+        self.assertTrue(hard)
+        self.assertEqual(hard, soft)
+
+        # With the goal as a hard instance, the MUSes are those of the soft instances including the goal, without it.
+        reasoner = SAT(scenario3x3.SATencoding)
+        for instances in InstanceGraph(problem.corpus).BFS(profile, 2):
+            if reasoner.checkInstances(instances | {problem.goal}):
+                # Satisfiable instances have no MUS, with or without hard instances.
+                self.assertEqual(list(reasoner.enumerateMUSes(instances, {problem.goal})), [])
+                self.assertEqual(list(reasoner.enumerateMUSes(instances | {problem.goal})), [])
+                continue
+            MUSes = set(map(frozenset, reasoner.enumerateMUSes(instances, {problem.goal})))
+            explanations = {MUS - {problem.goal} for MUS in map(frozenset, reasoner.enumerateMUSes(instances | {problem.goal})) if problem.goal in MUS}
+            self.assertTrue(explanations)
+            self.assertEqual({MUS for MUS in MUSes if reasoner.checkInstances(MUS)}, explanations)
+
+    def test_smallestMUSes(self):
+        """Test whether MUSes are enumerated smallest first, and whether the first justification found is then a shortest one."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+        profile = scenario3x3.get_profile('0>1>2,1>2>0,2>0>1')
+        corpus = theory.get_axioms(scenario3x3, ['Pareto', 'Neutrality', 'Faithfulness', 'Reinforcement', 'Cancellation'])
+        problem = JustificationProblem(profile, scenario3x3.get_outcome('0,1,2'), corpus)
+
+        reasoner = SAT(scenario3x3.SATencoding)
+        *_, instances = InstanceGraph(problem.corpus).BFS(profile, 2)
+        instances.add(problem.goal)
+        smallest = list(map(frozenset, reasoner.enumerateSmallestMUSes(instances)))
+        self.assertEqual(list(map(len, smallest)), sorted(map(len, smallest)))
+        self.assertEqual(set(smallest), set(map(frozenset, reasoner.enumerateMUSes(instances))))
+
+        justifications = list(problem.solve(extract = 'SAT', nontriviality = 'SAT', depth = 2))
+        first, = problem.solve(extract = 'SAT', nontriviality = 'SAT', depth = 2, maximum = 1, order = 'smallest')
+        self.assertEqual(len(first), min(map(len, justifications)))
+
+    def test_fewestProfiles(self):
+        """Test whether explanations are enumerated by the number of profiles they mention, then by size."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+        profile = scenario3x3.get_profile('0>1>2,1>2>0,2>0>1')
+        corpus = theory.get_axioms(scenario3x3, ['Pareto', 'Neutrality', 'Faithfulness', 'Reinforcement', 'Cancellation'])
+        problem = JustificationProblem(profile, scenario3x3.get_outcome('0,1,2'), corpus)
+
+        # The ranking of the web app.
+        key = lambda justification: (len(justification.involved_profiles), len(justification))
+        justifications = list(problem.solve(extract = 'SAT', nontriviality = 'SAT', depth = 2))
+        first, = problem.solve(extract = 'fewestProfilesSAT', nontriviality = 'SAT', depth = 2, maximum = 1)
+        self.assertEqual(key(first), min(map(key, justifications)))
+        self.assertIn(first, justifications)
+
+        cost = lambda MUS: (len(set().union(*(instance.mentions() for instance in MUS))), len(MUS))
+        *_, instances = InstanceGraph(problem.corpus).BFS(profile, 2)
+        instances.add(problem.goal)
+        MUSes = list(map(frozenset, problem.reasoners['fewestProfilesSAT'].enumerateMUSes(instances)))
+        allMUSes = set(map(frozenset, SAT(scenario3x3.SATencoding).enumerateMUSes(instances)))
+        self.assertEqual(list(map(cost, MUSes)), sorted(map(cost, MUSes)))
+        self.assertEqual(len(MUSes), len(set(MUSes)))
+        self.assertTrue(set(MUSes) <= allMUSes)
+        self.assertEqual(cost(MUSes[0]), min(map(cost, allMUSes)))
+
+    def test_incrementalSAT(self):
+        """Test whether the incremental reasoner answers like the SAT one over the depths of a search, and finds the same MUSes."""
+
+        scenario3x3 = self.scenarios[(3, 3)]
+        profile = scenario3x3.get_profile('0>1>2,1>2>0,2>0>1')
+        corpus = theory.get_axioms(scenario3x3, ['Pareto', 'Neutrality', 'Faithfulness', 'Reinforcement', 'Cancellation'])
+        problem = JustificationProblem(profile, scenario3x3.get_outcome('0,1,2'), corpus)
+        reasoner, fresh = IncrementalSAT(scenario3x3.SATencoding), SAT(scenario3x3.SATencoding)
+
+        for instances in InstanceGraph(problem.corpus).BFS(profile, 2):
+            instances.add(problem.goal)
+            satisfiable = fresh.checkInstances(instances)
+            self.assertEqual(reasoner.checkInstances(instances), satisfiable)
+            # Instances are added to the solver once.
+            self.assertEqual(set(reasoner._selectors), instances)
+            if not satisfiable:
+                core = reasoner.core(instances)
+                self.assertTrue(core <= instances)
+                self.assertFalse(fresh.checkInstances(core))
+                MUSes = list(reasoner.enumerateMUSes(instances))
+                self.assertEqual(len(MUSes), len(set(map(frozenset, MUSes))))
+                self.assertEqual(set(map(frozenset, MUSes)), set(map(frozenset, fresh.enumerateMUSes(instances))))
+
+        # The solver is not pickled.
+        self.assertEqual(pickle.loads(pickle.dumps(reasoner))._selectors, {})
+
     def test_topFunction(self):
         """Test whether the top function works for singleton profiles."""
         self.assertEqual('0', self.scenarios[(3, 3)].get_profile('1:0>1>2').top())